@@ -8,10 +8,14 @@ import urllib3
 import time
 import traceback
 from datetime import datetime
-from sklearn.exceptions import InconsistentVersionWarning
+try:
+    from sklearn.exceptions import InconsistentVersionWarning
 
-# Suppress only the InconsistentVersionWarning
-warnings.filterwarnings("ignore", category=InconsistentVersionWarning)
+    # Suppress only the InconsistentVersionWarning
+    warnings.filterwarnings("ignore", category=InconsistentVersionWarning)
+except ImportError:
+    # scikit-learn is optional when the NumPy tree evaluator is used
+    pass
 
 # Suppress urllib3 warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -111,10 +115,15 @@ def validate_input_format(file_path, expected_prefix=None):
 # ---------- Main Pipeline ----------
 
 # Main Pipeline 
-def run_analysis(circ_file, mirna_file, deg_file, max_genes_chemical=None, debug=False):
+def run_analysis(circ_file, mirna_file, deg_file, max_genes_chemical=None, debug=False, max_concurrency=8,
+                 data_dir=None, atlas_dir=None, workers=1, keep_intermediates=False,
+                 mirdb_db=None, deg_batch=None, plots="deferred", dpi=None,
+                 html_mode="inline", network_formats=("graphml", "parquet")):
     logger = logging.getLogger()
     start_time = time.time()
     run_analysis.max_genes_chemical = max_genes_chemical
+    import plot_renderer
+    pipe = None
 
     try:
         # Import here to avoid side effects when only asking for CLI help
@@ -124,6 +133,9 @@ def run_analysis(circ_file, mirna_file, deg_file, max_genes_chemical=None, debug
         from drug_gene_script import main as drug_gene_main
         from data_grabber import CircInteractomeUnavailableError
 
+        # Figures are emitted by each step and rendered per --plots
+        plot_renderer.configure(plots, dpi=dpi)
+
         # Basic validation for required files
         if not circ_file or not os.path.exists(circ_file):
             raise FileNotFoundError(f"Missing file: {circ_file}")
@@ -139,6 +151,10 @@ def run_analysis(circ_file, mirna_file, deg_file, max_genes_chemical=None, debug
 
         mirna_ids = validate_input_format(mirna_file, "hsa-miR")
         deg_ids = validate_input_format(deg_file)
+        for path in deg_batch or []:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Missing file: {path}")
+            validate_input_format(path)
         logger.info("[INFO] Inputs: %d circRNAs, %d miRNAs, %d DEGs",
                     len(circ_list), len(mirna_ids), len(deg_ids))
 
@@ -153,7 +169,8 @@ def run_analysis(circ_file, mirna_file, deg_file, max_genes_chemical=None, debug
         encoder_file = os.path.join(models_dir, 'label_encoder.pkl')
         scaler_file = os.path.join(models_dir, 'scaler.pkl')
 
-        for f in [model_file, encoder_file, scaler_file, circ_file, mirna_file, deg_file]:
+        # The model itself is checked by Predictor, which accepts a .pkl, .cbm or tree-evaluator export
+        for f in [encoder_file, scaler_file, circ_file, mirna_file, deg_file]:
             if not os.path.exists(f):
                 raise FileNotFoundError(f"Missing file: {f}")
 
@@ -176,7 +193,14 @@ def run_analysis(circ_file, mirna_file, deg_file, max_genes_chemical=None, debug
             scaler_file,
             "temp",
             "output",
-            data_dir=None
+            data_dir=data_dir,
+            max_concurrency=max_concurrency,
+            atlas_dir=atlas_dir,
+            workers=workers,
+            export_intermediates=keep_intermediates,
+            mirdb_db=mirdb_db,
+            html_mode=html_mode,
+            network_formats=network_formats
         )
 
         results = pipe.first_pipeline.process_all_circs()
@@ -189,6 +213,9 @@ def run_analysis(circ_file, mirna_file, deg_file, max_genes_chemical=None, debug
         logger.info("[INFO] Strong/Medium binding sites: %d", total_sites)
 
         overlap_df = pipe.first_pipeline.analyze_mrna_overlap()
+        if deg_batch:
+            # Extra contrasts reuse the miRDB targets retrieved for --deg
+            pipe.first_pipeline.analyze_contrasts(deg_batch)
         if overlap_df is not None and not overlap_df.empty:
             pipe.create_comprehensive_excel()
             logger.info("[INFO] Comprehensive interaction Excel generated")
@@ -237,7 +264,7 @@ def run_analysis(circ_file, mirna_file, deg_file, max_genes_chemical=None, debug
         logger.info("--------------------------------------------------")
         logger.info("[STEP 4] Building PPI network...")
         if os.path.exists(overlapping_path):
-            PPI_Analysis(overlapping_path)
+            PPI_Analysis(overlapping_path, html_mode=html_mode, network_formats=network_formats)
         else:
             logger.warning("[WARN] ⚠ Skipped PPI analysis: no overlapping genes file found (%s)", overlapping_path)
 
@@ -251,6 +278,7 @@ def run_analysis(circ_file, mirna_file, deg_file, max_genes_chemical=None, debug
         else:
             logger.warning("[WARN] ⚠ Skipped drug–gene analysis: no hub genes file found (%s)", hub_genes_path)
 
+        plot_renderer.finish()
         runtime = (time.time() - start_time) / 60
 
         logger.info("--------------------------------------------------")
@@ -278,25 +306,157 @@ def run_analysis(circ_file, mirna_file, deg_file, max_genes_chemical=None, debug
             if debug:
                 logger.error(traceback.format_exc())
         sys.exit(1)
+    finally:
+        # Report and shut down figures still queued, also when a step failed
+        plot_renderer.finish()
+        # The miRDB prefetch threads are not daemons: stop them so a failed run can exit
+        if pipe is not None:
+            pipe.first_pipeline.close_prefetcher()
 
 
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--circ", required=True, help="Path to file with circRNA IDs (one per line)")
-    parser.add_argument("--mirna", required=True, help="File with miRNA IDs (one per line)")
-    parser.add_argument("--deg", required=True, help="File with DEG gene symbols (one per line)")
+    parser = argparse.ArgumentParser(
+        epilog="--circ, --mirna and --deg are required unless one of the standalone modes --ingest, "
+               "--import_mirdb, --build_atlas, --serve, --export_native_model or --export_tree_evaluator "
+               "is given; those exit without running the analysis.")
+    parser.add_argument("--circ", help="Path to file with circRNA IDs (one per line); required for an analysis run")
+    parser.add_argument("--mirna", help="File with miRNA IDs (one per line); required for an analysis run")
+    parser.add_argument("--deg", help="File with DEG gene symbols (one per line); required for an analysis run")
     parser.add_argument("--debug", action="store_true", help="Enable debug logging and tracebacks")
     parser.add_argument("--mode", choices=["quick", "full"], default="full", help="Pipeline mode for time/coverage tradeoff")
     parser.add_argument("--max_genes", type=int, default=None, help="Maximum number of hub genes for drug-gene analysis in quick mode")
+    parser.add_argument("--max_concurrency", type=int, default=8, help="Maximum number of concurrent CircInteractome requests")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for step 1 parse/clean/predict (default: 1, in-process)")
+    parser.add_argument("--keep_intermediates", action="store_true",
+                        help="Also write intermediate stage tables (per-circRNA matches, overlapping mRNAs) to temp/")
+    parser.add_argument("--data_dir", default=None, help="Local CircInteractome data directory (cache or offline store)")
+    parser.add_argument("--ingest", default=None, metavar="SOURCE",
+                        help="Build an offline store in --data_dir from a directory/archive of site tables, then exit")
+    parser.add_argument("--atlas_dir", default=None,
+                        help="Prediction atlas directory; circRNAs found there skip fetch/clean/predict")
+    parser.add_argument("--build_atlas", default=None, metavar="CIRC_FILE",
+                        help="Score all circRNA IDs in CIRC_FILE into --atlas_dir, then exit")
+    parser.add_argument("--deg_batch", nargs="+", default=None, metavar="DEG_FILE",
+                        help="Additional DEG lists (one per contrast) to overlap with the same miRNA targets")
+    parser.add_argument("--mirdb_db", default=None,
+                        help="Local miRDB target database (SQLite) used instead of querying mirdb.org")
+    parser.add_argument("--import_mirdb", default=None, metavar="PREDICTION_FILE",
+                        help="Import miRDB's bulk MirTarget prediction file into --mirdb_db, then exit")
+    parser.add_argument("--mirdb_gene_map", default=None, metavar="MAP_FILE",
+                        help="Two-column RefSeq accession to gene symbol table used with --import_mirdb")
+    parser.add_argument("--plots", choices=["none", "deferred", "inline"], default="deferred",
+                        help="Figure rendering: in background processes (deferred), in each step (inline) or not at all")
+    parser.add_argument("--dpi", type=int, default=None, help="Resolution for every figure (default: per-figure)")
+    parser.add_argument("--html_mode", choices=["inline", "shared"], default="inline",
+                        help="Network HTML: self-contained pages, or shared vis.js assets plus compressed data files")
+    parser.add_argument("--network_formats", nargs="+", choices=["graphml", "parquet", "npz"],
+                        default=["graphml", "parquet"],
+                        help="Network export formats (omit graphml to skip the slow GraphML write)")
+    parser.add_argument("--serve", action="store_true",
+                        help="Run as a local HTTP/JSON service with a warm model and a job queue")
+    parser.add_argument("--host", default="127.0.0.1", help="Service bind address (with --serve)")
+    parser.add_argument("--port", type=int, default=8765, help="Service port (with --serve)")
+    parser.add_argument("--service_workers", type=int, default=2, help="Jobs run concurrently by the service")
+    parser.add_argument("--queue_size", type=int, default=32, help="Maximum number of queued service jobs")
+    parser.add_argument("--max_finished_jobs", type=int, default=100,
+                        help="Finished service jobs kept (status and folder) before the oldest are deleted")
+    parser.add_argument("--job_ttl", type=float, default=168,
+                        help="Hours a finished service job is kept before it is deleted")
+    parser.add_argument("--export_native_model", action="store_true",
+                        help="Convert the CatBoost model to native .cbm format, record artifact hashes, then exit")
+    parser.add_argument("--export_tree_evaluator", action="store_true",
+                        help="Export the model + scaler to a pure-NumPy tree evaluator (parity-checked), then exit")
     args = parser.parse_args()
 
+    if args.export_native_model:
+        setup_logging("pipeline.log", args.debug)
+        from model_artifacts import export_native_model, write_manifest
+        models_dir = os.path.join(os.path.dirname(__file__), "trained models")
+        export_native_model(os.path.join(models_dir, "catboost_model.pkl"))
+        write_manifest(models_dir, [os.path.join(models_dir, name) for name in ("label_encoder.pkl", "scaler.pkl")])
+        sys.exit(0)
+
+    if args.export_tree_evaluator:
+        setup_logging("pipeline.log", args.debug)
+        from model_artifacts import load_artifact, resolve_model_file, write_manifest
+        from tree_evaluator import export_evaluator, evaluator_path
+        models_dir = os.path.join(os.path.dirname(__file__), "trained models")
+        model_file = os.path.join(models_dir, "catboost_model.pkl")
+        out_path = evaluator_path(model_file)
+        export_evaluator(
+            load_artifact(resolve_model_file(model_file), "model"),
+            scaler=load_artifact(os.path.join(models_dir, "scaler.pkl"), "scaler"),
+            encoder=load_artifact(os.path.join(models_dir, "label_encoder.pkl"), "label encoder"),
+            path=out_path,
+        )
+        write_manifest(models_dir, [out_path])
+        sys.exit(0)
+
+    if args.ingest:
+        if not args.data_dir:
+            parser.error("--ingest requires --data_dir")
+        setup_logging("pipeline.log", args.debug)
+        from circ_store import ingest_site_tables
+        ingest_site_tables(args.ingest, args.data_dir)
+        sys.exit(0)
+
+    if args.import_mirdb:
+        if not args.mirdb_db:
+            parser.error("--import_mirdb requires --mirdb_db")
+        setup_logging("pipeline.log", args.debug)
+        from mirdb_store import import_mirdb
+        import_mirdb(args.import_mirdb, args.mirdb_db, gene_map_file=args.mirdb_gene_map)
+        sys.exit(0)
+
+    if args.build_atlas:
+        if not args.atlas_dir:
+            parser.error("--build_atlas requires --atlas_dir")
+        setup_logging("pipeline.log", args.debug)
+        from predictor import Predictor
+        from prediction_atlas import build_atlas
+        circ_ids = validate_input_format(args.build_atlas, "hsa_circ_")
+        build_atlas(circ_ids, args.atlas_dir, Predictor(), data_dir=args.data_dir or "temp",
+                    max_concurrency=args.max_concurrency)
+        sys.exit(0)
+
+    if args.serve:
+        setup_logging("pipeline.log", args.debug)
+        from pipeline_service import PipelineService, serve
+        models_dir = os.path.join(os.path.dirname(__file__), "trained models")
+        service = PipelineService(
+            os.path.join(models_dir, "catboost_model.pkl"),
+            os.path.join(models_dir, "label_encoder.pkl"),
+            os.path.join(models_dir, "scaler.pkl"),
+            data_dir=args.data_dir,
+            atlas_dir=args.atlas_dir,
+            workers=args.service_workers,
+            queue_size=args.queue_size,
+            max_concurrency=args.max_concurrency,
+            mirdb_db=args.mirdb_db,
+            html_mode=args.html_mode,
+            network_formats=args.network_formats,
+            max_finished_jobs=args.max_finished_jobs,
+            job_ttl=args.job_ttl * 3600,
+        )
+        serve(service, host=args.host, port=args.port)
+        sys.exit(0)
+
+    missing = [flag for flag in ("circ", "mirna", "deg") if not getattr(args, flag)]
+    if missing:
+        parser.error("the following arguments are required: " + ", ".join(f"--{m}" for m in missing))
+
     setup_logging("pipeline.log", args.debug)
     if args.mode == "quick":
         max_genes_chemical = args.max_genes or 50
     else:
         max_genes_chemical = args.max_genes
 
-    run_analysis(args.circ, args.mirna, args.deg, max_genes_chemical=max_genes_chemical, debug=args.debug)
+    run_analysis(args.circ, args.mirna, args.deg, max_genes_chemical=max_genes_chemical, debug=args.debug,
+                 max_concurrency=args.max_concurrency, data_dir=args.data_dir, atlas_dir=args.atlas_dir,
+                 workers=args.workers, keep_intermediates=args.keep_intermediates, mirdb_db=args.mirdb_db,
+                 deg_batch=args.deg_batch, plots=args.plots, dpi=args.dpi,
+                 html_mode=args.html_mode, network_formats=args.network_formats)
 
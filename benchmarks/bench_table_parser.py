@@ -0,0 +1,98 @@
+import os
+import sys
+import glob
+import time
+import logging
+import pandas as pd
+import requests
+from io import StringIO
+
+# Run from the repository root:
+#   python benchmarks/bench_table_parser.py record <circRNA_file> <pages_dir>
+#   python benchmarks/bench_table_parser.py <pages_dir> [repeat]
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from data_grabber import DataGrabber
+from table_parser import TABLE_ATTRS, parse_targets_table
+
+
+def parse_targets_table_legacy(html):
+    # Original BeautifulSoup + read_html path, the reference for parse_targets_table
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.find("table", TABLE_ATTRS)
+    if not table:
+        return None
+    df = pd.read_html(StringIO(str(table)))[0]
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = [f"{col[0]}_{col[1]}" for col in df.columns]
+    return df
+
+
+def record_pages(circ_ids, pages_dir):
+    """Save the raw CircInteractome response of each circRNA as ``{circ_id}_page.html``."""
+    logger = logging.getLogger()
+    os.makedirs(pages_dir, exist_ok=True)
+    base_url = DataGrabber(pages_dir).base_url
+    session = requests.Session()
+    recorded = 0
+    for circ_id in circ_ids:
+        resp = session.get(base_url, params={"circular_rna_query": circ_id}, verify=False, timeout=10)
+        if resp.status_code != 200:
+            logger.warning("[WARN] %s: HTTP %d", circ_id, resp.status_code)
+            continue
+        with open(os.path.join(pages_dir, f"{circ_id}_page.html"), "w", encoding="utf-8") as f:
+            f.write(resp.text)
+        recorded += 1
+    logger.info("[INFO] Recorded %d of %d pages in %s", recorded, len(circ_ids), pages_dir)
+    return recorded
+
+
+def benchmark_table_parsers(pages, repeat=5):
+    """Time the lxml parser against the BeautifulSoup + read_html path.
+
+    ``pages`` is a directory of recorded ``*.html`` pages (see
+    ``record_pages``) or a list of file paths.
+    Returns per-parser total seconds and whether all frames matched.
+    """
+    logger = logging.getLogger()
+    if isinstance(pages, str) and os.path.isdir(pages):
+        pages = sorted(glob.glob(os.path.join(pages, "*.html")))
+    texts = []
+    for path in pages:
+        with open(path, encoding="utf-8") as f:
+            texts.append(f.read())
+
+    timings = {}
+    outputs = {}
+    for name, parser in (("lxml", parse_targets_table), ("legacy", parse_targets_table_legacy)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            outputs[name] = [parser(t) for t in texts]
+        timings[name] = time.perf_counter() - start
+
+    identical = True
+    for new, old in zip(outputs["lxml"], outputs["legacy"]):
+        if (new is None) != (old is None):
+            identical = False
+        elif new is not None:
+            try:
+                pd.testing.assert_frame_equal(new, old, check_dtype=False)
+            except AssertionError:
+                identical = False
+
+    speedup = timings["legacy"] / timings["lxml"] if timings["lxml"] else float("nan")
+    logger.info("[INFO] Parsed %d pages x%d: lxml %.3fs, legacy %.3fs (%.1fx), identical=%s",
+                len(texts), repeat, timings["lxml"], timings["legacy"], speedup, identical)
+    return {"pages": len(texts), "repeat": repeat, "identical": identical, **timings}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if sys.argv[1] == "record":
+        with open(sys.argv[2], encoding="utf-8") as f:
+            circs = [line.strip() for line in f if line.strip()]
+        record_pages(circs, sys.argv[3])
+    else:
+        benchmark_table_parsers(sys.argv[1], repeat=int(sys.argv[2]) if len(sys.argv) > 2 else 5)
@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Run from the repository root: python benchmarks/bench_workers.py <circRNA_file> <store_dir> [workers ...]
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import plot_renderer
+from predictor import Predictor
+from analysis_pipeline import _init_worker, _score_in_worker
+
+
+def _worker_pid(_):
+    return os.getpid()
+
+
+def benchmark_workers(circ_ids, data_dir, worker_counts=(1, 4, 16), predictor=None):
+    """Time the parse/clean/predict part of step 1 for several process-pool sizes.
+
+    ``data_dir`` should already hold the site tables of ``circ_ids`` (cache
+    or offline store) so no HTTP requests are timed. Pools are started and
+    their models loaded before the clock starts.
+    """
+    import tempfile
+
+    logger = logging.getLogger()
+    predictor = predictor or Predictor()
+    model_files = (predictor.model_file, predictor.encoder_file, predictor.scaler_file, predictor.evaluator_file)
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in worker_counts:
+            with ProcessPoolExecutor(max_workers=n, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_worker,
+                                     initargs=(model_files, data_dir, tmp, logging.WARNING,
+                                               plot_renderer.settings())) as pool:
+                list(pool.map(_worker_pid, range(n * 4)))
+                start = time.perf_counter()
+                outcomes = list(pool.map(_score_in_worker, circ_ids,
+                                         chunksize=max(1, len(circ_ids) // (n * 4))))
+                timings[n] = time.perf_counter() - start
+            errors = sum(status != "ok" for status, _ in outcomes)
+            logger.info("[INFO] %d worker(s): %d circRNAs in %.2fs (%.1fx vs %d), %d errors",
+                        n, len(circ_ids), timings[n], timings[worker_counts[0]] / timings[n],
+                        worker_counts[0], errors)
+    logger.info("[INFO] CPUs available: %d", os.cpu_count() or 1)
+    return timings
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    with open(sys.argv[1], encoding="utf-8") as f:
+        circs = [line.strip() for line in f if line.strip()]
+    counts = tuple(int(n) for n in sys.argv[3:]) or (1, 4, 16)
+    benchmark_workers(circs, sys.argv[2], worker_counts=counts)
@@ -1,13 +1,110 @@
 import os
+import time
 import pandas as pd
-import matplotlib.pyplot as plt
 import logging
+import logging.handlers
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from file_loader import FileLoader
-from data_grabber import DataGrabber
+from data_grabber import DataGrabber, CircInteractomeUnavailableError
 from data_prepper import DataPrepper
 from predictor import Predictor
-from mrna_overlap import overlap_mrnas
+from site_schema import attach_predictions, strong_sites, site_memory_usage, STRONG_SITE_TYPES
+from prediction_atlas import PredictionAtlas, model_artifact_hash
+from artifact_store import ArtifactStore
+from incidence import CircMirnaIncidence
+from mrna_overlap import overlap_mrnas, overlap_mrnas_batch, MirdbPrefetcher
 from network_constructor import construct_circrna_mirna_mrna_network
+import plot_renderer
+from plot_renderer import submit_plot
+
+RESULT_COLS = [
+    "circ_id", "mirna_id", "TargetScan miRNA predictions_Site Type",
+    "TargetScan miRNA predictions_CircRNA Start", "TargetScan miRNA predictions_CircRNA End",
+    "TargetScan miRNA predictions_3' pairing", "TargetScan miRNA predictions_local AU",
+    "TargetScan miRNA predictions_TA", "TargetScan miRNA predictions_SPS",
+    "TargetScan miRNA predictions_context+ score", "TargetScan miRNA predictions_context+ score percentile",
+    "predicted_site_type", "encoded_prediction",
+    "prob_7mer-1a", "prob_7mer-m8", "prob_8mer-1a"
+]
+
+
+def write_circ_outputs(circ, filtered, temp_dir):
+    """Write a circRNA's strong/medium sites CSV (and debug pie chart); None if it has none."""
+    logger = logging.getLogger()
+    if filtered.empty:
+        logger.debug(f"[DEBUG] No strong/medium sites for {circ}")
+        return None
+
+    filtered[RESULT_COLS].to_csv(os.path.join(temp_dir, f"{circ}_strong_medium_results.csv"), index=False)
+
+    if logging.getLogger().level == logging.DEBUG:
+        breakdown = filtered["predicted_site_type"].value_counts(normalize=True)
+        sizes = [breakdown.get("7mer-m8", 0)*100, breakdown.get("8mer-1a", 0)*100]
+        labels = ["7mer-m8", "8mer-1a"]
+        submit_plot("site_type_pie", os.path.join(temp_dir, f"{circ}_interaction_chart.png"),
+                    sizes=sizes, labels=labels, title=f"{circ} Site Type Breakdown")
+
+    return filtered
+
+
+def finalize_sites(circ, full_data, preds, probs, codes, class_names, temp_dir):
+    """Attach predictions, keep strong/medium sites and write them; returns the (possibly empty) sites."""
+    attach_predictions(full_data, preds, probs, codes, class_names)
+    filtered = strong_sites(full_data)
+    logging.getLogger().debug(f"[DEBUG] {circ}: Cleaned {len(full_data)} rows → {len(filtered)} sites")
+    write_circ_outputs(circ, filtered, temp_dir)
+    return filtered
+
+
+# Per-process state for the process-pool mode, set up once by _init_worker
+_WORKER = {}
+
+
+def _init_worker(model_files, cache_dir, temp_dir, log_level, plot_settings, log_queue=None):
+    logger = logging.getLogger()
+    logger.setLevel(log_level)
+    if log_queue is not None:
+        # Spawned workers have no handlers of their own; the parent writes their records
+        logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+    # Scoring workers are already off the main process, so their plots render in place
+    mode = "none" if plot_settings["mode"] == "none" else "inline"
+    plot_renderer.configure(mode, dpi=plot_settings["dpi"])
+    model_file, encoder_file, scaler_file, evaluator_file = model_files
+    predictor = Predictor(model_file, encoder_file, scaler_file, evaluator_file=evaluator_file)
+    # Load the model once per worker, not once per circRNA
+    if predictor.evaluator is None:
+        _ = predictor.model
+    _ = predictor.class_names
+    _WORKER.update(grabber=DataGrabber(cache_dir, max_concurrency=1), prepper=DataPrepper(),
+                   predictor=predictor, temp_dir=temp_dir)
+
+
+def _score_in_worker(circ):
+    # Returns (status, payload) so one bad circRNA never takes down the pool:
+    #   ("ok", sites or None), ("deferred", CircInteractomeUnavailableError), ("error", message)
+    logger = logging.getLogger()
+    try:
+        data = _WORKER["grabber"].fetch(circ)
+        if data is None:
+            logger.debug(f"[DEBUG] No data for {circ}")
+            return "ok", None
+        predictor = _WORKER["predictor"]
+        features, full_data = _WORKER["prepper"].clean(data, predictor.encoder)
+        if features is None:
+            logger.debug(f"[DEBUG] Failed to clean data for {circ}")
+            return "ok", None
+        preds, probs, codes = predictor.predict(features)
+        if preds is None:
+            logger.debug(f"[DEBUG] Prediction failed for {circ}")
+            return "ok", None
+        return "ok", finalize_sites(circ, full_data, preds, probs, codes,
+                                    predictor.class_names, _WORKER["temp_dir"])
+    except CircInteractomeUnavailableError as e:
+        return "deferred", e
+    except Exception as e:
+        return "error", f"{type(e).__name__}: {e}"
+
 
 class AnalysisPipeline:
     def __init__(self, circ_file, mirna_file, deg_file,
@@ -15,23 +112,68 @@ class AnalysisPipeline:
                  model_file="trained models/calibrated_catboost_site_type_model.pkl",
                  encoder_file="trained models/label_encoder.pkl",
                  scaler_file="trained models/robust_scaler.pkl",
-                 data_dir=None):
+                 data_dir=None, max_concurrency=8,
+                 max_retries=3, retry_delay=5, atlas_dir=None,
+                 predictor=None, grabber=None, atlas=None, workers=1,
+                 export_intermediates=False, artifacts=None, stream_overlap=True, chunk_size=256,
+                 mirdb_db=None, html_mode="inline", network_formats=("graphml", "parquet")):
         self.loader = FileLoader(circ_file, mirna_file, deg_file)
         
         self.data_dir = data_dir
-        self.grabber = DataGrabber(data_dir or temp_dir)
+        # predictor/grabber/atlas may be passed in to share warm instances across runs
+        if grabber is None:
+            grabber = DataGrabber(data_dir or temp_dir, max_concurrency=max_concurrency)
+            grabber.migrate_excel_cache()
+        self.grabber = grabber
         if data_dir:
             logging.getLogger().info("[INFO] DataGrabber will use local data directory: %s", data_dir)
+            if self.grabber.offline:
+                logging.getLogger().info("[INFO] Offline store: %d circRNAs indexed, no HTTP requests",
+                                         len(self.grabber.store_index))
         self.prepper = DataPrepper()
-        self.predictor = Predictor(model_file, encoder_file, scaler_file)
+        self.predictor = predictor or Predictor(model_file, encoder_file, scaler_file)
+        # Precomputed predictions keyed by (circ ID, model artifact hash)
+        if atlas is None and atlas_dir:
+            atlas = PredictionAtlas(atlas_dir, model_artifact_hash(self.predictor))
+        self.atlas = atlas
+        if self.atlas is not None:
+            logging.getLogger().info("[INFO] Prediction atlas: %s (%d circRNAs)", self.atlas.root, len(self.atlas))
         self.temp_dir = temp_dir
         self.output_dir = output_dir
+        # Deferred retries for circRNAs whose fetch hit server downtime
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.failed_circs = []
+        # Worker processes for step 1 (1 = score in this process)
+        self.workers = max(1, int(workers or 1))
+        self.circ_errors = {}
+        # Matched miRNAs go to miRDB as soon as their circRNA is scored (see _emit_matched)
+        self.stream_overlap = stream_overlap
+        self.chunk_size = chunk_size
+        self.mirdb_prefetcher = None
+        # Local miRDB database (see mirdb_store.import_mirdb); replaces web lookups when set
+        self.mirdb_db = mirdb_db
+        # Network HTML: self-contained ("inline") or shared assets + compressed data ("shared")
+        self.html_mode = html_mode
+        # Network files written by construct_network (see network_export.NETWORK_FORMATS)
+        self.network_formats = tuple(network_formats)
+        # circRNA × miRNA incidence of strong/medium sites, built once in find_strong_hits
+        self.incidence = None
+        self.matched_incidence = None
+        # Stage outputs are handed on in memory; temp CSVs only when exporting
+        self.artifacts = artifacts if artifacts is not None else ArtifactStore(temp_dir if export_intermediates else None)
         os.makedirs(temp_dir, exist_ok=True)
         os.makedirs(output_dir, exist_ok=True)
 
-    def process_single_circ(self, circ):
+    def process_single_circ(self, circ, data=None):
         logger = logging.getLogger()
-        data = self.grabber.fetch(circ)
+        if self.atlas is not None and circ in self.atlas:
+            sites = self.atlas.get(circ)
+            if sites is not None:
+                logger.debug(f"[DEBUG] {circ}: served from prediction atlas")
+                return self._emit_circ(circ, sites)
+        if data is None:
+            data = self.grabber.fetch(circ)
         if data is None:
             logger.debug(f"[DEBUG] No data for {circ}")
             return None
@@ -46,89 +188,219 @@ class AnalysisPipeline:
             logger.debug(f"[DEBUG] Prediction failed for {circ}")
             return None
 
-        full_data["predicted_site_type"] = preds
-        full_data["encoded_prediction"] = codes
-        for i, cname in enumerate(self.predictor.class_names):
-            full_data[f"prob_{cname}"] = probs[:, i]
+        filtered = self._finalize_circ(circ, full_data, preds, probs, codes)
+        if self.atlas is not None:
+            # The atlas writes its index in batches; call self.atlas.flush() after the last circRNA
+            self.atlas.put(circ, filtered)
+        return None if filtered.empty else filtered
 
-        mask = full_data["predicted_site_type"].isin(["7mer-m8", "8mer-1a"])
-        filtered = full_data[mask].copy()
+    def _finalize_circ(self, circ, full_data, preds, probs, codes):
+        return finalize_sites(circ, full_data, preds, probs, codes, self.predictor.class_names, self.temp_dir)
 
-        if filtered.empty:
-            logger.debug(f"[DEBUG] No strong/medium sites for {circ}")
-            return None
+    def _emit_circ(self, circ, filtered):
+        return write_circ_outputs(circ, filtered, self.temp_dir)
+
+    def _score_round(self, pending):
+        """Fetch, clean and batch-predict ``pending`` in this process; {circ: (status, payload)}."""
+        logger = logging.getLogger()
+        fetched = self.grabber.fetch_many(pending, return_errors=True)
+        outcomes = {}
+        cleaned = {}
+        for circ in pending:
+            data = fetched.get(circ)
+            if isinstance(data, CircInteractomeUnavailableError):
+                outcomes[circ] = ("deferred", data)
+                continue
+            if data is None:
+                logger.debug(f"[DEBUG] No data for {circ}")
+                outcomes[circ] = ("ok", None)
+                continue
+            try:
+                features, full_data = self.prepper.clean(data, self.predictor.encoder)
+            except Exception as e:
+                outcomes[circ] = ("error", f"{type(e).__name__}: {e}")
+                continue
+            if features is None:
+                logger.debug(f"[DEBUG] Failed to clean data for {circ}")
+                outcomes[circ] = ("ok", None)
+                continue
+            cleaned[circ] = (features, full_data)
+
+        # One scaler transform and one model call for the whole round
+        predictions = self.predictor.predict_batch({c: f for c, (f, _) in cleaned.items()})
+        for circ, (_, full_data) in cleaned.items():
+            if circ not in predictions:
+                logger.debug(f"[DEBUG] Prediction failed for {circ}")
+                outcomes[circ] = ("ok", None)
+                continue
+            try:
+                outcomes[circ] = ("ok", self._finalize_circ(circ, full_data, *predictions[circ]))
+            except Exception as e:
+                outcomes[circ] = ("error", f"{type(e).__name__}: {e}")
+        return outcomes
+
+    def _score_stream(self, pending, pool):
+        """Yield (circ, (status, payload)) in input order as circRNAs finish scoring."""
+        if pool is not None:
+            # map() yields in submission order, whatever order workers finish in
+            chunksize = max(1, len(pending) // (self.workers * 4))
+            yield from zip(pending, pool.map(_score_in_worker, pending, chunksize=chunksize))
+            return
+        for start in range(0, len(pending), self.chunk_size):
+            chunk = pending[start:start + self.chunk_size]
+            outcomes = self._score_round(chunk)
+            for circ in chunk:
+                yield circ, outcomes[circ]
 
-        cols = [
-            "circ_id", "mirna_id", "TargetScan miRNA predictions_Site Type",
-            "TargetScan miRNA predictions_CircRNA Start", "TargetScan miRNA predictions_CircRNA End",
-            "TargetScan miRNA predictions_3' pairing", "TargetScan miRNA predictions_local AU",
-            "TargetScan miRNA predictions_TA", "TargetScan miRNA predictions_SPS",
-            "TargetScan miRNA predictions_context+ score", "TargetScan miRNA predictions_context+ score percentile",
-            "predicted_site_type", "encoded_prediction",
-            "prob_7mer-1a", "prob_7mer-m8", "prob_8mer-1a"
-        ]
-
-        filtered[cols].to_csv(os.path.join(self.temp_dir, f"{circ}_strong_medium_results.csv"), index=False)
-        logger.debug(f"[DEBUG] {circ}: Cleaned {len(full_data)} rows → {len(filtered)} sites")
-
-        if logging.getLogger().level == logging.DEBUG:
-            breakdown = filtered["predicted_site_type"].value_counts(normalize=True)
-            sizes = [breakdown.get("7mer-m8", 0)*100, breakdown.get("8mer-1a", 0)*100]
-            labels = ["7mer-m8", "8mer-1a"]
-            fig, ax = plt.subplots(figsize=(5, 5))
-            ax.pie(sizes, labels=labels, autopct="%1.1f%%", colors=["#66c2a5", "#fc8d62"], startangle=90)
-            ax.set_title(f"{circ} Site Type Breakdown")
-            plt.savefig(os.path.join(self.temp_dir, f"{circ}_interaction_chart.png"))
-            plt.close()
-
-        return filtered
+    def _emit_matched(self, sites):
+        if self.mirdb_prefetcher is None or sites is None or sites.empty:
+            return
+        matched = set(sites["mirna_id"].dropna().astype(str).str.strip()) & self._input_mirnas
+        if matched:
+            self.mirdb_prefetcher.submit(sorted(matched))
+
+    def _make_pool(self, n_circs):
+        if self.workers <= 1 or n_circs <= 1:
+            return None
+        model_files = (self.predictor.model_file, self.predictor.encoder_file,
+                       self.predictor.scaler_file, self.predictor.evaluator_file)
+        # spawn, as in plot_renderer: HTTP sessions, miRDB prefetch and service job threads must not be forked
+        context = multiprocessing.get_context("spawn")
+        log_queue = context.Queue()
+        self._log_listener = logging.handlers.QueueListener(log_queue, *logging.getLogger().handlers,
+                                                            respect_handler_level=True)
+        self._log_listener.start()
+        return ProcessPoolExecutor(
+            max_workers=min(self.workers, n_circs),
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(model_files, self.grabber.save_dir, self.temp_dir, logging.getLogger().level,
+                      plot_renderer.settings(), log_queue),
+        )
 
     def process_all_circs(self):
         logger = logging.getLogger()
         results = {}
-        for circ in self.loader.get_circs():
-            data = self.process_single_circ(circ)
-            if data is not None:
-                results[circ] = data
+        # Sorted so that output order does not depend on set iteration order
+        circs = sorted(self.loader.get_circs())
+        pending = circs
+        if self.stream_overlap and not self.mirdb_db:
+            if self.mirdb_prefetcher is not None:
+                self.mirdb_prefetcher.close()
+            self.mirdb_prefetcher = MirdbPrefetcher()
+            self._input_mirnas = set(self.loader.get_mirnas())
+        if self.atlas is not None:
+            pending = []
+            for circ in circs:
+                sites = self.atlas.get(circ)
+                if sites is None:
+                    pending.append(circ)
+                    continue
+                emitted = self._emit_circ(circ, sites)
+                if emitted is not None:
+                    results[circ] = emitted
+                    self._emit_matched(emitted)
+            logger.info("[INFO] Prediction atlas: %d hits, %d circRNAs to score",
+                        len(circs) - len(pending), len(pending))
+        last_error = None
+        self.circ_errors = {}
+        pool = self._make_pool(len(pending))
+        try:
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    delay = self.retry_delay * 2 ** (attempt - 1)
+                    logger.warning("[WARN] CircInteractome unavailable for %d circRNAs; retry %d/%d in %ds",
+                                   len(pending), attempt, self.max_retries, delay)
+                    time.sleep(delay)
+
+                start = time.perf_counter()
+                deferred = []
+                for circ, (status, payload) in self._score_stream(pending, pool):
+                    if status == "deferred":
+                        logger.debug(f"[DEBUG] Deferred {circ}: {payload}")
+                        deferred.append(circ)
+                        last_error = payload
+                        continue
+                    if status == "error":
+                        logger.warning("[WARN] %s failed: %s", circ, payload)
+                        self.circ_errors[circ] = payload
+                        continue
+                    if payload is None:
+                        continue
+                    if self.atlas is not None:
+                        self.atlas.put(circ, payload)
+                    if not payload.empty:
+                        results[circ] = payload
+                        self._emit_matched(payload)
+                logger.info("[INFO] Scored %d circRNAs in %.2fs (workers=%d)", len(pending),
+                            time.perf_counter() - start, self.workers if pool else 1)
+                pending = deferred
+                if not pending:
+                    break
+        finally:
+            if pool is not None:
+                pool.shutdown()
+                self._log_listener.stop()
+
+        if self.atlas is not None:
+            self.atlas.flush()
+        self.failed_circs = pending
+        if pending:
+            if len(pending) == len(circs):
+                # Nothing could be fetched at all: treat the run as failed
+                self.close_prefetcher()
+                raise last_error
+            failed_path = os.path.join(self.output_dir, "failed_circrnas.txt")
+            with open(failed_path, "w", encoding="utf-8") as f:
+                f.write("\n".join(pending) + "\n")
+            logger.warning("[WARN] Partial success: %d of %d circRNAs could not be fetched after %d retries (%s)",
+                           len(pending), len(circs), self.max_retries, failed_path)
+        if self.circ_errors:
+            logger.warning("[WARN] %d circRNAs failed during scoring: %s",
+                           len(self.circ_errors), ", ".join(sorted(self.circ_errors)))
+        results = {circ: results[circ] for circ in circs if circ in results}
         logger.info("[INFO]  Processed %d circRNAs", len(results))
+        logger.debug(f"[DEBUG] Site tables in memory: {site_memory_usage(results) / 1e6:.1f} MB")
         return results
 
     def find_strong_hits(self, results):
         logger = logging.getLogger()
         logger.info(" STEP 2: Matching Strong/Medium Hits")
-        strong_hits = {}
-        all_mirnas = set()
-        for circ, df in results.items():
-            hits = df[df["predicted_site_type"].isin(["7mer-m8", "8mer-1a"])]["mirna_id"].unique().tolist()
-            if hits:
-                strong_hits[circ] = hits
-                all_mirnas.update(hits)
+        self.incidence = CircMirnaIncidence.from_results(results)
+        strong_hits = self.incidence.to_dict()
+        all_mirnas = self.incidence.present_mirnas()
         logger.info("[INFO]  %d circRNAs with %d total miRNAs", len(strong_hits), len(all_mirnas))
         return strong_hits, all_mirnas
 
     def match_mirnas(self, results, strong_hits, all_mirnas):
         logger = logging.getLogger()
+        if self.incidence is None:
+            self.incidence = CircMirnaIncidence.from_results(results)
         input_mirnas = self.loader.get_mirnas()
         matched = all_mirnas.intersection(input_mirnas)
+        self.matched_incidence = self.incidence.select_mirnas(matched)
         logger.info("[INFO]  %d matched miRNAs", len(matched))
+        logger.debug(f"[DEBUG] {len(self.matched_incidence.circs)} circRNAs, "
+                     f"{len(self.matched_incidence)} matched circRNA–miRNA pairs")
+
         matched_data = {}
-        for circ, mirnas in strong_hits.items():
-            common = set(mirnas).intersection(matched)
-            logger.debug(f"[DEBUG] {circ}: {len(common)} matched miRNAs")
-            if common:
-                df = results[circ]
-                subset = df[(df["predicted_site_type"].isin(["7mer-m8", "8mer-1a"])) &
-                            (df["mirna_id"].isin(common))]
-                matched_data[circ] = subset
-                subset.to_csv(os.path.join(self.temp_dir, f"{circ}_strong_medium_matches.csv"), index=False)
-                logger.debug(f"[DEBUG] Saved: {circ}_strong_medium_matches.csv")
+        matches = pd.DataFrame()
+        circs = [c for c in self.matched_incidence.circs if c in results]
+        if circs:
+            # One mask over all matched circRNAs' sites instead of one filter per circRNA
+            sites = pd.concat([results[c] for c in circs], ignore_index=True)
+            matches = sites[sites["predicted_site_type"].isin(STRONG_SITE_TYPES) &
+                            sites["mirna_id"].astype(str).isin(matched)]
+            matched_data = {circ: df for circ, df in matches.groupby(matches["circ_id"].astype(str), sort=False)}
+        self.artifacts.put("matches", matches)
         return matched_data
 
     def analyze_mrna_overlap(self):
         logger = logging.getLogger()
         logger.info(" STEP 3: DEG–miRNA mRNA Overlap ===")
         try:
-            df = overlap_mrnas(self.loader.deg_path, self.temp_dir, self.output_dir)
+            df = overlap_mrnas(self.loader.deg_path, self.temp_dir, self.output_dir, artifacts=self.artifacts,
+                               prefetcher=self.mirdb_prefetcher, mirdb_db=self.mirdb_db)
             if df.empty:
                 logger.info("[INFO]  No overlaps found")
             else:
@@ -137,9 +409,30 @@ class AnalysisPipeline:
         except Exception as e:
             logger.error("[ERROR]  Overlap failed: %s", e)
             return pd.DataFrame()
+        finally:
+            self.close_prefetcher()
+
+    def close_prefetcher(self):
+        """Stop the miRDB prefetch threads started by process_all_circs (no-op if none)."""
+        if self.mirdb_prefetcher is not None:
+            self.mirdb_prefetcher.close()
+            self.mirdb_prefetcher = None
+
+    def analyze_contrasts(self, deg_files):
+        """Overlap for several DEG lists at once; targets are shared with analyze_mrna_overlap."""
+        logger = logging.getLogger()
+        logger.info(" STEP 3b: DEG–miRNA mRNA Overlap for %d contrasts", len(deg_files))
+        try:
+            return overlap_mrnas_batch(deg_files, self.temp_dir, self.output_dir, artifacts=self.artifacts,
+                                       prefetcher=self.mirdb_prefetcher, mirdb_db=self.mirdb_db)
+        except Exception as e:
+            logger.error("[ERROR]  Contrast overlap failed: %s", e)
+            return {}
 
     def construct_network(self, results, strong_hits, all_mirnas):
         logger = logging.getLogger()
         logger.info(" STEP 4: Regulatory Network Construction")
-        G = construct_circrna_mirna_mrna_network(results, strong_hits, all_mirnas, self.temp_dir, self.output_dir)
-        return G
\ No newline at end of file
+        G = construct_circrna_mirna_mrna_network(results, strong_hits, all_mirnas, self.temp_dir, self.output_dir,
+                                                 artifacts=self.artifacts, incidence=self.matched_incidence,
+                                                 html_mode=self.html_mode, network_formats=self.network_formats)
+        return G
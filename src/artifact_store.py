@@ -0,0 +1,98 @@
+import os
+import glob
+import logging
+import pandas as pd
+
+# Tables handed from one pipeline stage to the next. "columns" are checked on
+# put(); "file" is the name it is exported under in temp, as the file-based
+# stages used to write it ("{circ}" artifacts are one file per circRNA).
+ARTIFACT_SPECS = {
+    "matches": {
+        "columns": ["circ_id", "mirna_id", "predicted_site_type"],
+        "file": "{circ}_strong_medium_matches.csv",
+    },
+    "overlapping_mrnas": {
+        "columns": ["mirna", "gene"],
+        "file": "overlapping_mrnas.csv",
+    },
+    "mirdb_targets": {
+        "columns": ["mirna", "gene"],
+        "file": "mirdb_targets.csv",
+    },
+}
+
+
+class ArtifactStore:
+    """In-memory DataFrames passed between pipeline stages.
+
+    With ``export_dir`` set, every artifact is also written to disk under
+    its file name when it is stored.
+    """
+
+    def __init__(self, export_dir=None):
+        self.export_dir = export_dir
+        self._tables = {}
+
+    def __contains__(self, name):
+        return name in self._tables
+
+    @staticmethod
+    def _spec(name):
+        if name not in ARTIFACT_SPECS:
+            raise KeyError(f"Unknown artifact: {name}")
+        return ARTIFACT_SPECS[name]
+
+    def put(self, name, df):
+        spec = self._spec(name)
+        if not isinstance(df, pd.DataFrame):
+            raise TypeError(f"Artifact {name} must be a DataFrame, got {type(df).__name__}")
+        missing = [c for c in spec["columns"] if c not in df.columns]
+        if missing and not df.empty:
+            raise ValueError(f"Artifact {name} is missing columns: {', '.join(missing)}")
+        self._tables[name] = df
+        if self.export_dir:
+            self.export(name)
+        return df
+
+    def get(self, name, default=None):
+        self._spec(name)
+        return self._tables.get(name, default)
+
+    def export(self, name, export_dir=None):
+        """Write artifact ``name`` to ``export_dir`` (default: the store's) under its legacy file name(s)."""
+        logger = logging.getLogger()
+        export_dir = export_dir or self.export_dir
+        df = self._tables[name]
+        pattern = self._spec(name)["file"]
+        os.makedirs(export_dir, exist_ok=True)
+        if "{circ}" in pattern:
+            paths = []
+            for circ, group in df.groupby("circ_id", sort=False, observed=True):
+                path = os.path.join(export_dir, pattern.format(circ=circ))
+                group.to_csv(path, index=False)
+                paths.append(path)
+            logger.debug(f"[DEBUG] Exported {name}: {len(paths)} files in {export_dir}")
+            return paths
+        path = os.path.join(export_dir, pattern)
+        df.to_csv(path, index=False)
+        logger.info("[INFO] Saved: %s", path)
+        return [path]
+
+    def get_or_load(self, name, directory):
+        """The in-memory artifact, else its legacy file(s) read from ``directory``, else None."""
+        df = self.get(name)
+        if df is not None:
+            return df
+        return load_artifact_files(name, directory)
+
+
+def load_artifact_files(name, directory):
+    """Read an artifact previously exported to ``directory``; None if absent."""
+    pattern = ArtifactStore._spec(name)["file"]
+    if "{circ}" in pattern:
+        files = sorted(glob.glob(os.path.join(directory, pattern.format(circ="*"))))
+        if not files:
+            return None
+        return pd.concat([pd.read_csv(f) for f in files], ignore_index=True)
+    path = os.path.join(directory, pattern)
+    return pd.read_csv(path) if os.path.exists(path) else None
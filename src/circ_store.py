@@ -0,0 +1,158 @@
+import os
+import re
+import json
+import shutil
+import logging
+import tarfile
+import zipfile
+import tempfile
+from datetime import datetime
+import pandas as pd
+from data_grabber import DataGrabber, STORE_INDEX
+from table_parser import parse_targets_table
+
+MIRBASE_ID_COL = "TargetScan miRNA predictions_CircRNA Mirbase ID"
+COLUMN_PREFIX = "TargetScan miRNA predictions_"
+_CIRC_ID_RE = re.compile(r"hsa_circ_\d+")
+
+
+def _read_table(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".html", ".htm"):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return parse_targets_table(f.read())
+    if ext in (".xlsx", ".xls"):
+        return pd.read_excel(path)
+    if ext == ".parquet":
+        return pd.read_parquet(path)
+    if ext == ".csv":
+        return pd.read_csv(path)
+    if ext in (".tsv", ".txt"):
+        return pd.read_csv(path, sep="\t")
+    return None
+
+
+def _normalize_columns(df):
+    # Plain TargetScan exports carry single-level headers; give them the
+    # same flattened names CircInteractome pages produce.
+    if MIRBASE_ID_COL in df.columns or "CircRNA Mirbase ID" not in df.columns:
+        return df
+    return df.rename(columns={c: f"{COLUMN_PREFIX}{c}" for c in df.columns
+                              if not str(c).startswith(COLUMN_PREFIX)})
+
+
+def _split_by_circ(df, path):
+    if MIRBASE_ID_COL in df.columns:
+        circ_ids = (df[MIRBASE_ID_COL].astype(str).str.replace("\xa0", " ", regex=False)
+                    .str.split().str[0])
+        return {circ: part.reset_index(drop=True) for circ, part in df.groupby(circ_ids, sort=False)}
+    match = _CIRC_ID_RE.search(os.path.basename(path))
+    if match:
+        return {match.group(0): df}
+    return {}
+
+
+def _within(workdir, name):
+    root = os.path.realpath(workdir)
+    return os.path.realpath(os.path.join(root, name)).startswith(root + os.sep)
+
+
+def _extract_zip(source, workdir):
+    logger = logging.getLogger()
+    with zipfile.ZipFile(source) as zf:
+        for info in zf.infolist():
+            if not _within(workdir, info.filename):
+                logger.warning("[WARN] Skipped archive member outside the extraction folder: %s", info.filename)
+                continue
+            zf.extract(info, workdir)
+
+
+def _extract_tar(source, workdir):
+    logger = logging.getLogger()
+    with tarfile.open(source) as tf:
+        if hasattr(tarfile, "data_filter"):
+            # Python 3.12+ (and security backports): rejects absolute paths, "..", links and devices
+            tf.extractall(workdir, filter="data")
+            return
+        members = []
+        for member in tf.getmembers():
+            if not (member.isfile() or member.isdir()) or not _within(workdir, member.name):
+                logger.warning("[WARN] Skipped archive member (link, device or outside path): %s", member.name)
+                continue
+            members.append(member)
+        tf.extractall(workdir, members=members)
+
+
+def _iter_source_files(source, workdir):
+    if os.path.isdir(source):
+        root = source
+    elif zipfile.is_zipfile(source):
+        _extract_zip(source, workdir)
+        root = workdir
+    elif tarfile.is_tarfile(source):
+        _extract_tar(source, workdir)
+        root = workdir
+    else:
+        yield source
+        return
+    for dirpath, _, filenames in os.walk(root):
+        for name in sorted(filenames):
+            yield os.path.join(dirpath, name)
+
+
+def ingest_site_tables(source, data_dir):
+    """Build an offline CircInteractome store in ``data_dir`` from bulk exports.
+
+    ``source`` is a directory, a zip/tar archive or a single file holding
+    CircInteractome pages or TargetScan site tables (.html, .xlsx, .csv,
+    .tsv, .parquet). Rows are grouped by circRNA ID and written in the
+    DataGrabber cache format, with an index that switches DataGrabber
+    into offline mode for this directory.
+    """
+    logger = logging.getLogger()
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"Ingest source not found: {source}")
+
+    grabber = DataGrabber(data_dir)
+    index_path = os.path.join(data_dir, STORE_INDEX)
+    index = {}
+    if os.path.exists(index_path):
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f).get("circs", {})
+
+    tables = {}
+    skipped = 0
+    workdir = tempfile.mkdtemp(prefix="circ_ingest_")
+    try:
+        for path in _iter_source_files(source, workdir):
+            try:
+                df = _read_table(path)
+            except Exception as e:
+                logger.warning("[WARN] Could not read %s: %s", path, e)
+                df = None
+            if df is None or df.empty:
+                skipped += 1
+                continue
+            parts = _split_by_circ(_normalize_columns(df), path)
+            if not parts:
+                logger.warning("[WARN] No circRNA ID found in %s, skipped", path)
+                skipped += 1
+                continue
+            for circ, part in parts.items():
+                tables.setdefault(circ, []).append(part)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for circ, parts in tables.items():
+        df = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+        save_path = grabber._cache_path(circ)
+        grabber._save_cached(df, save_path)
+        index[circ] = {"file": os.path.basename(save_path), "rows": int(len(df))}
+
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump({"created": datetime.now().isoformat(timespec="seconds"),
+                   "source": os.path.abspath(source),
+                   "circs": index}, f, indent=1, sort_keys=True)
+
+    logger.info("[INFO] Ingested %d circRNAs into %s (%d files skipped)", len(tables), data_dir, skipped)
+    return index
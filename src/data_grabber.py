@@ -1,10 +1,24 @@
 import os
-import time
+import glob
+import json
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import requests
-from bs4 import BeautifulSoup
-from io import StringIO
 from requests.exceptions import Timeout, ConnectionError, RequestException
+from table_parser import parse_targets_table
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+CACHE_SUFFIX = "_targets.parquet"
+LEGACY_CACHE_SUFFIX = "_targets.xlsx"
+# Written by circ_store.ingest_site_tables; its presence makes the directory an offline store
+STORE_INDEX = "circ_store_index.json"
 
 
 class CircInteractomeUnavailableError(RuntimeError):
@@ -13,21 +27,103 @@ class CircInteractomeUnavailableError(RuntimeError):
 
 
 class DataGrabber:
-    def __init__(self, save_dir="my_output"):
+    def __init__(self, save_dir="my_output", max_concurrency=8):
         self.base_url = "https://circinteractome.nia.nih.gov/api/v2/mirnasearch"
         self.save_dir = save_dir
+        self.max_concurrency = max(1, int(max_concurrency))
         self.session = requests.Session()
+        # One session per worker thread for the async fetch mode, so
+        # concurrent requests each keep their own connection pool.
+        self._local = threading.local()
 
         if not os.path.exists(save_dir):
             os.makedirs(save_dir)
 
+        self.store_index = None
+        index_path = os.path.join(save_dir, STORE_INDEX)
+        if os.path.exists(index_path):
+            with open(index_path, encoding="utf-8") as f:
+                self.store_index = json.load(f).get("circs", {})
+
+    @property
+    def offline(self):
+        return self.store_index is not None
+
+    def _get_session(self):
+        if threading.current_thread() is threading.main_thread():
+            return self.session
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+        return session
+
+    def _cache_path(self, circ_id):
+        suffix = CACHE_SUFFIX if HAS_PYARROW else LEGACY_CACHE_SUFFIX
+        return os.path.join(self.save_dir, f"{circ_id}{suffix}")
+
+    @staticmethod
+    def _with_cache_dtypes(df):
+        # Parquet needs one type per column: numbers keep their numeric dtype,
+        # everything else is stored as text (missing cells stay null).
+        df = df.copy()
+        for col in df.columns:
+            if df[col].dtype == object:
+                df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+        return df
+
+    def _save_cached(self, df, save_path):
+        if save_path.endswith(CACHE_SUFFIX):
+            df = self._with_cache_dtypes(df)
+            df.to_parquet(save_path, index=False)
+        else:
+            df.to_excel(save_path, index=False)
+        return df
+
+    def _load_cached(self, save_path):
+        if save_path.endswith(CACHE_SUFFIX):
+            return pd.read_parquet(save_path)
+        return pd.read_excel(save_path)
+
+    def migrate_excel_cache(self):
+        """Convert legacy ``{circ_id}_targets.xlsx`` caches to Parquet (one-time).
+
+        Not run by the constructor: call it once per run from the setup path
+        that owns the cache directory. Without pyarrow the Excel cache stays.
+        """
+        if not HAS_PYARROW:
+            return 0
+        migrated = 0
+        for xlsx_path in glob.glob(os.path.join(self.save_dir, f"*{LEGACY_CACHE_SUFFIX}")):
+            circ_id = os.path.basename(xlsx_path)[:-len(LEGACY_CACHE_SUFFIX)]
+            parquet_path = os.path.join(self.save_dir, f"{circ_id}{CACHE_SUFFIX}")
+            try:
+                if not os.path.exists(parquet_path):
+                    self._save_cached(pd.read_excel(xlsx_path), parquet_path)
+                os.remove(xlsx_path)
+                migrated += 1
+            except Exception:
+                # Leave unreadable caches alone; fetch() will refresh them
+                continue
+        return migrated
+
+    def _fetch_from_store(self, circ_id):
+        entry = self.store_index.get(circ_id)
+        if entry is None:
+            return None
+        return self._load_cached(os.path.join(self.save_dir, entry["file"]))
+
     def fetch(self, circ_id):
-        save_path = os.path.join(self.save_dir, f"{circ_id}_targets.xlsx")
+        if self.offline:
+            # Offline store built by ingest: serve from disk, never touch the network
+            return self._fetch_from_store(circ_id)
+
+        save_path = self._cache_path(circ_id)
 
         
         if os.path.exists(save_path):
             try:
-                df = pd.read_excel(save_path)
+                df = self._load_cached(save_path)
                 return df
             except Exception:
                 # If cached file is corrupt, fall back to fetching from server
@@ -35,7 +131,7 @@ class DataGrabber:
 
         params = {"circular_rna_query": circ_id}
         try:
-            resp = self.session.get(
+            resp = self._get_session().get(
                 self.base_url,
                 params=params,
                 verify=False,
@@ -60,13 +156,53 @@ class DataGrabber:
             # Non-success but not clear downtime (e.g., 400/404) → behave as no data
             return None
 
-        soup = BeautifulSoup(resp.text, "html.parser")
-        table = soup.find("table", {"border": "1", "bordercolor": "#006699"})
-        if table:
-            df = pd.read_html(StringIO(str(table)))[0]
-            if isinstance(df.columns, pd.MultiIndex):
-                df.columns = [f"{col[0]}_{col[1]}" for col in df.columns]
-            df.to_excel(save_path, index=False)
-            return df
+        df = parse_targets_table(resp.text)
+        if df is not None:
+            return self._save_cached(df, save_path)
+
+        return None
+
+    async def fetch_async(self, circ_id, semaphore=None):
+        # The blocking request runs in a worker thread; the semaphore caps
+        # how many requests are in flight against the NIH server at once.
+        if semaphore is None:
+            return await asyncio.to_thread(self.fetch, circ_id)
+        async with semaphore:
+            return await asyncio.to_thread(self.fetch, circ_id)
 
-        return None
\ No newline at end of file
+    async def _fetch_or_error(self, circ_id, semaphore):
+        try:
+            return await self.fetch_async(circ_id, semaphore)
+        except CircInteractomeUnavailableError as e:
+            return e
+
+    async def _fetch_all(self, circ_ids, max_concurrency, return_errors=False):
+        semaphore = asyncio.Semaphore(max_concurrency)
+        fetch = self._fetch_or_error if return_errors else self.fetch_async
+        tasks = [asyncio.ensure_future(fetch(c, semaphore)) for c in circ_ids]
+        try:
+            frames = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return dict(zip(circ_ids, frames))
+
+    def fetch_many(self, circ_ids, max_concurrency=None, return_errors=False):
+        """Fetch several circRNAs concurrently; returns {circ_id: DataFrame or None}.
+
+        A CircInteractomeUnavailableError from any request is propagated,
+        exactly as with sequential ``fetch`` calls. With ``return_errors``
+        the error is stored as that circRNA's value instead.
+        """
+        circ_ids = list(dict.fromkeys(circ_ids))
+        if not circ_ids:
+            return {}
+        limit = max(1, int(max_concurrency or self.max_concurrency))
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self._fetch_all(circ_ids, limit, return_errors))
+        # Already inside an event loop (e.g. a notebook): run on a helper thread
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, self._fetch_all(circ_ids, limit, return_errors)).result()
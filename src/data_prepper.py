@@ -1,4 +1,8 @@
 import pandas as pd
+from site_schema import apply_site_schema
+
+MIRBASE_ID_COL = "TargetScan miRNA predictions_CircRNA Mirbase ID"
+PAIRING_COL = "TargetScan miRNA predictions_CircRNA (Top) - miRNA (Bottom) pairing"
 
 class DataPrepper:
     def __init__(self):
@@ -28,37 +32,34 @@ class DataPrepper:
             "TargetScan miRNA predictions_context+ score percentile"
         ]
 
+    @staticmethod
+    def split_ids(ids):
+        # First whitespace-separated token is the circRNA; the miRNA is the
+        # first token containing "hsa-miR-" ("none" if there is none).
+        text = ids.str.replace("\xa0", " ", regex=False)
+        circ_ids = text.str.extract(r"^\s*(\S+)", expand=False)
+        mirna_ids = text.str.extract(r"(?<!\S)(\S*hsa-miR-\S*)", expand=False).fillna("none")
+        return circ_ids, mirna_ids
+
     def clean(self, data, encoder):
         if data is None or data.empty:
             return None, None
 
-        def split_line(text):
-            text = text.replace("\xa0", " ")
-            pieces = text.split()
-            circ = pieces[0]
-            mirna = "none"
-            for piece in pieces:
-                if "hsa-miR-" in piece:
-                    mirna = piece
-                    break
-            return circ, mirna
-
         try:
-            circ_ids, mirna_ids = zip(*[split_line(row) for row in data["TargetScan miRNA predictions_CircRNA Mirbase ID"]])
-            data["circ_id"] = circ_ids
-            data["mirna_id"] = mirna_ids
+            circ_ids, mirna_ids = self.split_ids(data[MIRBASE_ID_COL])
+            data["circ_id"] = circ_ids.to_numpy(dtype=object)
+            data["mirna_id"] = mirna_ids.to_numpy(dtype=object)
         except KeyError as e:
             return None, None
 
         # Convert to numeric
-        for col in self.numeric_cols:
-            data[col] = pd.to_numeric(data[col], errors="coerce")
+        data[self.numeric_cols] = data[self.numeric_cols].apply(pd.to_numeric, errors="coerce")
+
+        # Extract and fill features (one new frame, no intermediate copy)
+        fill_values = {MIRBASE_ID_COL: "missing", PAIRING_COL: "missing"}
+        fill_values.update({col: 0 for col in self.numeric_cols})
+        features = data[self.cols_to_keep].fillna(fill_values)
 
-        # Extract and fill features
-        features = data[self.cols_to_keep].copy()
-        features["TargetScan miRNA predictions_CircRNA Mirbase ID"] = features["TargetScan miRNA predictions_CircRNA Mirbase ID"].fillna("missing")
-        features["TargetScan miRNA predictions_CircRNA (Top) - miRNA (Bottom) pairing"] = features["TargetScan miRNA predictions_CircRNA (Top) - miRNA (Bottom) pairing"].fillna("missing")
-        for col in self.numeric_cols:
-            features[col] = features[col].fillna(0)
+        # Features stay float64 for the model; the retained table goes compact
+        return features, apply_site_schema(data)
 
-        return features, data
\ No newline at end of file
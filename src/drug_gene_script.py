@@ -5,10 +5,9 @@ from datetime import datetime
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import requests_cache
 from chembl_webresource_client.new_client import new_client
+from plot_renderer import submit_plot
 
 # Setup caching for API calls
 requests_cache.install_cache('chembl_cache', expire_after=86400)
@@ -120,22 +119,11 @@ def plot_labeled_potency_heatmap(df):
     # Combined label for heatmap cells
     annot_matrix = pivoted_names + "\n(" + pivoted_values.round(2).astype(str) + ")"
 
-    plt.figure(figsize=(18, 8))
-    sns.heatmap(pivoted_values, 
-                annot=annot_matrix, 
-                fmt="", 
-                cmap='YlGnBu', 
-                cbar_kws={'label': 'pIC50 Potency'},
-                annot_kws={"size": 9})
-
-    plt.title(f'Top {TOP_N_DRUGS} Potent Drugs per Primary Target Gene', fontsize=16)
-    plt.xlabel('Drug Rank (by pIC50)', fontsize=12)
-    plt.ylabel('Target Gene', fontsize=12)
-    plt.tight_layout()
-    
-    plt.savefig(OUTPUT_PLOT_HEATMAP, dpi=300)
-    plt.close()
-    logger.info("Optimized heatmap saved to %s", OUTPUT_PLOT_HEATMAP)
+    if submit_plot("potency_heatmap", OUTPUT_PLOT_HEATMAP,
+                   values=pivoted_values,
+                   annot=annot_matrix,
+                   title=f'Top {TOP_N_DRUGS} Potent Drugs per Primary Target Gene'):
+        logger.info("Optimized heatmap: %s", OUTPUT_PLOT_HEATMAP)
 
 # ================= MAIN =================
 def main(hub_genes_path=None, max_genes=None):
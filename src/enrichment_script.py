@@ -2,9 +2,9 @@ import os
 import logging
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import gseapy as gp
 from datetime import datetime
+from plot_renderer import submit_plot
 
 logger = logging.getLogger(__name__)
 
@@ -89,36 +89,15 @@ def run_enrichment_pipeline(genes, temp_dir, output_dir, top_n=30):
             # -----------------------
             # BUBBLE PLOT
             # -----------------------
-            plt.figure(figsize=(8, 6))
-
             plot_df = df.sort_values('-log10(p)', ascending=False)
 
-            scatter = plt.scatter(
-                x=plot_df['Enrichment Factor'],
-                y=plot_df['Term'],
-                s=plot_df['Gene Count'] * 20,   # bubble size
-                c=plot_df['-log10(p)'],         # color = significance
-                cmap='viridis',
-                alpha=0.8
-            )
-
-            plt.colorbar(scatter, label='-log10(Adjusted P-value)')
-
-            plt.xlabel("Enrichment Factor")
-            plt.ylabel("Terms")
-            plt.title(f"Enrichment Bubble Plot - {lib}")
-
-            plt.grid(True)
-
-            plt.tight_layout()
-
-            plt.savefig(
+            submit_plot(
+                "enrichment_bubble",
                 os.path.join(output_dir, f"enrichment_bubble_{lib}.png"),
-                dpi=300
+                plot_df=plot_df[['Enrichment Factor', 'Term', 'Gene Count', '-log10(p)']],
+                title=f"Enrichment Bubble Plot - {lib}"
             )
 
-            plt.close()
-
             all_results.append(df)
 
         except Exception as e:
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from site_schema import PROBABILITY_PREFIX, STRONG_SITE_TYPES
+
+
+class CircMirnaIncidence:
+    """Sparse circRNA × miRNA incidence of strong/medium binding sites.
+
+    Rows index ``circs`` and columns index ``mirnas`` (both numpy arrays of
+    IDs). ``counts`` holds the number of sites per pair and ``max_prob`` the
+    highest strong/medium class probability among them.
+    """
+
+    def __init__(self, circs, mirnas, counts, max_prob):
+        self.circs = np.asarray(circs, dtype=object)
+        self.mirnas = np.asarray(mirnas, dtype=object)
+        self.counts = sparse.csr_matrix(counts)
+        self.max_prob = sparse.csr_matrix(max_prob)
+        self._circ_index = {c: i for i, c in enumerate(self.circs)}
+        self._mirna_index = {m: j for j, m in enumerate(self.mirnas)}
+        self._by_mirna = None
+
+    @classmethod
+    def from_sites(cls, sites, site_types=STRONG_SITE_TYPES):
+        """Build from a site table with circ_id, mirna_id and predicted_site_type columns."""
+        if sites is None or sites.empty:
+            empty = sparse.csr_matrix((0, 0))
+            return cls([], [], empty, empty)
+        if "predicted_site_type" in sites.columns:
+            sites = sites[sites["predicted_site_type"].isin(site_types)]
+        sites = sites.dropna(subset=["circ_id", "mirna_id"])
+        circ_codes, circs = pd.factorize(sites["circ_id"].astype(str), sort=True)
+        mirna_codes, mirnas = pd.factorize(sites["mirna_id"].astype(str), sort=True)
+        shape = (len(circs), len(mirnas))
+
+        # Duplicate (circ, miRNA) entries are summed by the COO -> CSR conversion
+        counts = sparse.coo_matrix((np.ones(len(sites), dtype=np.int32), (circ_codes, mirna_codes)),
+                                   shape=shape).tocsr()
+        prob_cols = [f"{PROBABILITY_PREFIX}{t}" for t in site_types if f"{PROBABILITY_PREFIX}{t}" in sites.columns]
+        if prob_cols:
+            pair_max = (pd.DataFrame({"c": circ_codes, "m": mirna_codes,
+                                      "p": sites[prob_cols].astype(np.float32).max(axis=1).to_numpy()})
+                        .groupby(["c", "m"], sort=False)["p"].max())
+            max_prob = sparse.coo_matrix((pair_max.to_numpy(), (pair_max.index.get_level_values(0),
+                                                                pair_max.index.get_level_values(1))),
+                                         shape=shape).tocsr()
+        else:
+            max_prob = sparse.csr_matrix(shape, dtype=np.float32)
+        return cls(np.asarray(circs), np.asarray(mirnas), counts, max_prob)
+
+    @classmethod
+    def from_results(cls, results, site_types=STRONG_SITE_TYPES):
+        """Build from the {circ_id: site DataFrame} mapping returned by step 1."""
+        frames = [df for df in results.values() if df is not None and not df.empty]
+        if not frames:
+            return cls.from_sites(None)
+        cols = ["circ_id", "mirna_id", "predicted_site_type"]
+        cols += [f"{PROBABILITY_PREFIX}{t}" for t in site_types]
+        sites = pd.concat([df[[c for c in cols if c in df.columns]].astype({"circ_id": str, "mirna_id": str})
+                           for df in frames], ignore_index=True)
+        return cls.from_sites(sites, site_types)
+
+    @property
+    def shape(self):
+        return self.counts.shape
+
+    def __len__(self):
+        return self.counts.nnz
+
+    def mirnas_for(self, circ):
+        i = self._circ_index.get(circ)
+        if i is None:
+            return []
+        return self.mirnas[self.counts.indices[self.counts.indptr[i]:self.counts.indptr[i + 1]]].tolist()
+
+    def circs_for(self, mirna):
+        j = self._mirna_index.get(mirna)
+        if j is None:
+            return []
+        if self._by_mirna is None:
+            self._by_mirna = self.counts.tocsc()
+        by_mirna = self._by_mirna
+        return self.circs[by_mirna.indices[by_mirna.indptr[j]:by_mirna.indptr[j + 1]]].tolist()
+
+    def mirna_mask(self, mirna_ids):
+        """Boolean mask over the miRNA axis for IDs in ``mirna_ids``."""
+        return np.isin(self.mirnas, list(mirna_ids))
+
+    def select_mirnas(self, mirna_ids):
+        """Sub-incidence restricted to ``mirna_ids`` (e.g. the matched set); empty rows are dropped."""
+        cols = np.flatnonzero(self.mirna_mask(mirna_ids))
+        counts = self.counts[:, cols].tocsr()
+        rows = np.flatnonzero(np.diff(counts.indptr))
+        return CircMirnaIncidence(self.circs[rows], self.mirnas[cols],
+                                  counts[rows], self.max_prob[:, cols][rows])
+
+    def present_mirnas(self):
+        """miRNAs with at least one site."""
+        per_mirna = np.bincount(self.counts.indices, minlength=len(self.mirnas))
+        return set(self.mirnas[per_mirna > 0].tolist())
+
+    def to_dict(self):
+        """{circ: [miRNAs]} for circRNAs with at least one site."""
+        indptr, indices = self.counts.indptr, self.counts.indices
+        return {circ: self.mirnas[indices[indptr[i]:indptr[i + 1]]].tolist()
+                for i, circ in enumerate(self.circs) if indptr[i + 1] > indptr[i]}
+
+    def pairs(self):
+        """One row per (circ_id, mirna_id) pair with its site count and max probability."""
+        coo = self.counts.tocoo()
+        max_prob = np.asarray(self.max_prob[coo.row, coo.col]).ravel() if coo.nnz else np.empty(0)
+        return pd.DataFrame({
+            "circ_id": self.circs[coo.row],
+            "mirna_id": self.mirnas[coo.col],
+            "sites": coo.data,
+            "max_prob": max_prob,
+        })
@@ -0,0 +1,104 @@
+import os
+import re
+import time
+import sqlite3
+import logging
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+
+MIRDB_COLUMNS = ["mirna", "refseq", "score"]
+_REFSEQ = re.compile(r"^[NX][MR]_\d+")
+# SQLite caps the number of bound parameters per statement
+_MAX_PARAMS = 900
+
+
+def _load_gene_map(gene_map_file):
+    """RefSeq accession (no version) -> gene symbol, from a two-column CSV/TSV."""
+    table = pd.read_csv(gene_map_file, sep=None, engine="python", header=None, dtype=str).iloc[:, :2]
+    table.columns = ["refseq", "gene"]
+    table = table[table["refseq"].str.match(_REFSEQ, na=False) & table["gene"].notna()]
+    table["refseq"] = table["refseq"].str.split(".").str[0]
+    return table.drop_duplicates("refseq").set_index("refseq")["gene"].str.strip().str.upper()
+
+
+def import_mirdb(prediction_file, db_path, gene_map_file=None, species_prefix="hsa-", chunk_size=500_000):
+    """Load miRDB's bulk MirTarget predictions into an SQLite database indexed by miRNA.
+
+    ``prediction_file`` is the tab-separated download (miRNA, RefSeq
+    accession, target score; plain or gzipped). miRDB lists targets by
+    RefSeq accession, so ``gene_map_file`` (RefSeq accession, gene symbol)
+    is needed to match DEG symbols; unmapped targets keep their accession.
+    """
+    logger = logging.getLogger()
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    gene_map = _load_gene_map(gene_map_file) if gene_map_file else None
+    if gene_map is None:
+        logger.warning("[WARN] No RefSeq-to-symbol map given; targets are stored as RefSeq accessions")
+
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    rows = unmapped = 0
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("CREATE TABLE targets (mirna TEXT NOT NULL, gene TEXT NOT NULL, refseq TEXT, score REAL)")
+        reader = pd.read_csv(prediction_file, sep="\t", header=None, names=MIRDB_COLUMNS,
+                             dtype={"mirna": str, "refseq": str, "score": float}, chunksize=chunk_size)
+        for chunk in reader:
+            if species_prefix:
+                chunk = chunk[chunk["mirna"].str.startswith(species_prefix, na=False)]
+            refseq = chunk["refseq"].str.split(".").str[0]
+            genes = refseq.map(gene_map) if gene_map is not None else pd.Series(index=chunk.index, dtype=object)
+            unmapped += int(genes.isna().sum())
+            chunk = chunk.assign(gene=genes.fillna(refseq), refseq=refseq)
+            chunk[["mirna", "gene", "refseq", "score"]].to_sql("targets", conn, if_exists="append", index=False)
+            rows += len(chunk)
+        conn.execute("CREATE INDEX idx_targets_mirna ON targets (mirna)")
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("source", os.path.abspath(prediction_file)),
+            ("gene_map", os.path.abspath(gene_map_file) if gene_map_file else ""),
+            ("created", datetime.now().isoformat(timespec="seconds")),
+            ("rows", str(rows)),
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+    if gene_map is not None and unmapped:
+        logger.warning("[WARN] %d of %d targets had no gene symbol in %s", unmapped, rows, gene_map_file)
+    logger.info("[INFO] miRDB database: %d targets written to %s (%.1fs)", rows, db_path, time.perf_counter() - start)
+    return db_path
+
+
+class MirdbDatabase:
+    """Read-only target lookups against a database built by ``import_mirdb``."""
+
+    def __init__(self, db_path):
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"miRDB database not found: {db_path}")
+        self.db_path = db_path
+
+    def lookup(self, mirnas):
+        """Targets of ``mirnas`` as a DataFrame (mirna, gene, score); best score per pair."""
+        mirnas = list(dict.fromkeys(mirnas))
+        frames = []
+        # Opened per call so lookups can run from any thread
+        conn = sqlite3.connect(Path(self.db_path).resolve().as_uri() + "?mode=ro", uri=True)
+        try:
+            for i in range(0, len(mirnas), _MAX_PARAMS):
+                batch = mirnas[i:i + _MAX_PARAMS]
+                query = ("SELECT mirna, gene, MAX(score) AS score FROM targets "
+                         f"WHERE mirna IN ({','.join('?' * len(batch))}) GROUP BY mirna, gene")
+                frames.append(pd.read_sql_query(query, conn, params=batch))
+        finally:
+            conn.close()
+        if not frames:
+            return pd.DataFrame(columns=["mirna", "gene", "score"])
+        return pd.concat(frames, ignore_index=True)
+
+    def targets(self, mirna_name):
+        """Gene list for one miRNA, like ``query_mirdb_optimized``."""
+        return self.lookup([mirna_name])["gene"].tolist()
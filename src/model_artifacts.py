@@ -0,0 +1,94 @@
+import os
+import json
+import time
+import pickle
+import hashlib
+import logging
+
+# Optional manifest next to the artifacts: {"<file name>": "<sha256 hex>"}
+MANIFEST_NAME = "artifact_hashes.json"
+NATIVE_SUFFIX = ".cbm"
+
+_hash_cache = {}
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if key not in _hash_cache:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        _hash_cache[key] = digest.hexdigest()
+    return _hash_cache[key]
+
+
+def load_manifest(models_dir):
+    path = os.path.join(models_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(models_dir, paths):
+    manifest = load_manifest(models_dir)
+    for path in paths:
+        if path and os.path.exists(path):
+            manifest[os.path.basename(path)] = file_sha256(path)
+    with open(os.path.join(models_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return manifest
+
+
+def verify_artifact(path):
+    """Return the file's sha256, raising RuntimeError if it disagrees with the manifest."""
+    digest = file_sha256(path)
+    expected = load_manifest(os.path.dirname(path) or ".").get(os.path.basename(path))
+    if expected and expected != digest:
+        raise RuntimeError(f"Checksum mismatch for {path}: expected {expected[:12]}, got {digest[:12]}")
+    return digest
+
+
+def native_model_path(model_file):
+    return os.path.splitext(model_file)[0] + NATIVE_SUFFIX
+
+
+def resolve_model_file(model_file):
+    # Prefer the native CatBoost export when one sits next to the pickle
+    if model_file.endswith(NATIVE_SUFFIX):
+        return model_file
+    native = native_model_path(model_file)
+    return native if os.path.exists(native) else model_file
+
+
+def load_artifact(path, kind):
+    """Load a pickled or native (.cbm) artifact, verifying its hash and logging load time."""
+    logger = logging.getLogger()
+    start = time.perf_counter()
+    digest = verify_artifact(path)
+    if path.endswith(NATIVE_SUFFIX):
+        from catboost import CatBoostClassifier
+
+        obj = CatBoostClassifier()
+        obj.load_model(path, format="cbm")
+    else:
+        with open(path, "rb") as f:
+            obj = pickle.load(f)
+    logger.info("[INFO] Loaded %s: %s (%.2fs, sha256 %s)",
+                kind, path, time.perf_counter() - start, digest[:12])
+    return obj
+
+
+def export_native_model(model_file, native_file=None):
+    """Write a pickled CatBoost model in CatBoost's native .cbm format and record hashes."""
+    logger = logging.getLogger()
+    native_file = native_file or native_model_path(model_file)
+    model = load_artifact(model_file, "model")
+    if not hasattr(model, "save_model"):
+        raise RuntimeError(f"{model_file} is not a CatBoost model; cannot export to {NATIVE_SUFFIX}")
+    model.save_model(native_file, format="cbm")
+    write_manifest(os.path.dirname(native_file) or ".", [model_file, native_file])
+    logger.info("[INFO] Native model written: %s", native_file)
+    return native_file
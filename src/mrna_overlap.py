@@ -1,20 +1,18 @@
 import os
-import glob
 import time
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
-from matplotlib_venn import venn2_unweighted
-import matplotlib.pyplot as plt
 import logging
-import warnings
+import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import lru_cache
 import json
 from pathlib import Path
-
-
-warnings.filterwarnings("ignore", category=UserWarning, module="matplotlib_venn")
+from artifact_store import load_artifact_files
+from mirdb_store import MirdbDatabase
+from plot_renderer import submit_plot
 
 
 CACHE_DIR = Path("temp/mirna_cache")
@@ -36,29 +34,119 @@ def _load_from_cache(mirna_name):
     return None
 
 def _save_to_cache(mirna_name, targets):
-    
+    # Shared by concurrent service jobs and fetch threads: write a private temp
+    # file and rename it into place, so readers never see a partial file
     cache_path = _get_cache_path(mirna_name)
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
     try:
-        with open(cache_path, 'w') as f:
+        with open(tmp_path, 'w') as f:
             json.dump(targets, f)
+        os.replace(tmp_path, cache_path)
     except Exception:
-        pass
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+MIRDB_URL = "https://mirdb.org/cgi-bin/search.cgi"
+MIRDB_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+
+# One keep-alive session per worker thread, reused across queries
+_local = threading.local()
+
+
+def _get_session():
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update(MIRDB_HEADERS)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        session.mount("https://", adapter)
+        _local.session = session
+    return session
+
+
+class AdaptiveConcurrency:
+    """Limit on in-flight miRDB requests, adjusted from latency and errors.
 
+    The limit grows by one after a window of ``limit`` fast successes and
+    is halved (at most once per ``cooldown`` seconds) on an error or when a
+    response takes over ``slow_factor`` times the baseline latency. The
+    baseline is an exponentially weighted mean of successful latencies
+    (weight ``baseline_alpha`` for the newest), so it follows the server
+    when it gets slower or faster instead of pinning to one lucky response.
+    """
 
-def query_mirdb_optimized(mirna_name, session=None, max_retries=2, retry_delay=1):
+    def __init__(self, initial=4, min_limit=1, max_limit=16, slow_factor=3.0, cooldown=2.0, baseline_alpha=0.1):
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.slow_factor = slow_factor
+        self.cooldown = cooldown
+        self.baseline_alpha = baseline_alpha
+        self.requests = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self._in_flight = 0
+        self._successes = 0
+        self._base_latency = None
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self, latency, ok=True):
+        with self._cond:
+            self._in_flight -= 1
+            self.requests += 1
+            self.total_latency += latency
+            slow = False
+            if ok:
+                if self._base_latency is None:
+                    self._base_latency = latency
+                slow = latency > self.slow_factor * self._base_latency
+                self._base_latency += self.baseline_alpha * (latency - self._base_latency)
+            new_limit = self.limit
+            if not ok or slow:
+                self.errors += not ok
+                self._successes = 0
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown:
+                    new_limit = max(self.min_limit, self.limit // 2)
+                    self._last_decrease = now
+            else:
+                self._successes += 1
+                if self._successes >= self.limit:
+                    new_limit = min(self.max_limit, self.limit + 1)
+                    self._successes = 0
+            if new_limit != self.limit:
+                logging.getLogger().debug(f"[DEBUG] miRDB concurrency {self.limit} -> {new_limit} "
+                                          f"({'error' if not ok else f'{latency:.2f}s'})")
+                self.limit = new_limit
+            self._cond.notify_all()
+
+    def summary(self):
+        mean = self.total_latency / self.requests if self.requests else 0.0
+        return (f"{self.requests} requests, {self.errors} errors, mean latency {mean:.2f}s, "
+                f"concurrency {self.limit}")
+
+
+def query_mirdb_optimized(mirna_name, session=None, max_retries=2, retry_delay=1, limiter=None):
     
     
     cached_targets = _load_from_cache(mirna_name)
     if cached_targets is not None:
         return cached_targets
     
+    logger = logging.getLogger()
     if session is None:
-        session = requests.Session()
-        session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        session = _get_session()
     
-    url = "https://mirdb.org/cgi-bin/search.cgi"
     payload = {
         "species": "Human",
         "searchBox": mirna_name,
@@ -67,9 +155,24 @@ def query_mirdb_optimized(mirna_name, session=None, max_retries=2, retry_delay=1
     }
 
     for attempt in range(max_retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        start = time.perf_counter()
+        ok = False
         try:
-            response = session.post(url, data=payload, timeout=15)
+            response = session.post(MIRDB_URL, data=payload, timeout=15)
             response.raise_for_status()
+            ok = True
+        except Exception as e:
+            error = e
+        finally:
+            elapsed = time.perf_counter() - start
+            if limiter is not None:
+                limiter.release(elapsed, ok)
+        logger.debug(f"[DEBUG] miRDB {mirna_name}: {'ok' if ok else 'failed'} in {elapsed:.2f}s "
+                     f"(attempt {attempt + 1})")
+
+        if ok:
             soup = BeautifulSoup(response.text, 'html.parser')
 
             rows = soup.find_all('tr')
@@ -85,49 +188,33 @@ def query_mirdb_optimized(mirna_name, session=None, max_retries=2, retry_delay=1
             _save_to_cache(mirna_name, targets)  # Cache results
             return targets
 
-        except Exception as e:
-            if attempt < max_retries:
-                time.sleep(retry_delay)
-            else:
-                logging.getLogger().warning(f"[WARN] Failed to query miRDB for {mirna_name}: {e}")
-                return []
+        if attempt < max_retries:
+            # Back off exponentially so a struggling server gets room to recover
+            time.sleep(retry_delay * 2 ** attempt)
+        else:
+            logger.warning(f"[WARN] Failed to query miRDB for {mirna_name}: {error}")
+            return []
 
 def query_mirdb(mirna_name, max_retries=3, retry_delay=5):
     return query_mirdb_optimized(mirna_name, max_retries=max_retries, retry_delay=retry_delay)
 
-def overlap_mrnas(deg_file, matches_dir='my_output', output_dir='.'):
+def _query_targets(mirnas, limiter=None):
     logger = logging.getLogger()
-    os.makedirs(output_dir, exist_ok=True)
-
-    mirna_files = glob.glob(os.path.join(matches_dir, '*_strong_medium_matches.csv'))
-    if not mirna_files:
-        raise FileNotFoundError("[ERROR] No match files found")
-
-    mirnas = set()
-    for file in mirna_files:
-        df = pd.read_csv(file)
-        if 'mirna_id' in df.columns:
-            mirnas.update(df['mirna_id'].dropna().str.strip())
-    mirnas = list(mirnas)
-
-    with open(deg_file, 'r', encoding='utf-8') as f:
-        degs = pd.Series(f.readlines()).str.strip().str.upper().drop_duplicates()
-    degs = degs[degs != '']
-    logger.info("[INFO] DEGs loaded: %d", len(degs))
-
-    
     logger.info("[INFO]  Querying miRDB for %d miRNAs in parallel...", len(mirnas))
+    limiter = limiter or AdaptiveConcurrency()
+    start = time.perf_counter()
     mirna_targets = []
     
     def process_mirna(mirna):
         """Process a single miRNA query"""
-        targets = query_mirdb_optimized(mirna)
+        targets = query_mirdb_optimized(mirna, limiter=limiter)
         if targets:
             return [{'mirna': mirna, 'gene': g} for g in targets]
         return []
     
     
-    with ThreadPoolExecutor(max_workers=min(8, len(mirnas))) as executor:
+    # The limiter, not the pool size, decides how many requests are in flight
+    with ThreadPoolExecutor(max_workers=max(1, min(limiter.max_limit, len(mirnas)))) as executor:
         future_to_mirna = {executor.submit(process_mirna, mirna): mirna for mirna in mirnas}
         
         for future in as_completed(future_to_mirna):
@@ -138,36 +225,231 @@ def overlap_mrnas(deg_file, matches_dir='my_output', output_dir='.'):
                 logger.debug(f"[DEBUG] Processed {mirna}: {len(result)} targets")
             except Exception as e:
                 logger.error(f"[ERROR] Failed to process {mirna}: {e}")
-    
-    logger.info("[INFO]  Completed parallel miRDB queries")
+    if limiter.requests:
+        elapsed = time.perf_counter() - start
+        logger.info("[INFO]  miRDB: %s; %.1f queries/s", limiter.summary(), limiter.requests / elapsed)
+    return mirna_targets
+
+
+class MirdbPrefetcher:
+    """Background miRDB lookups fed while step 1 is still scoring circRNAs.
 
-    if not mirna_targets:
+    ``submit`` can be called again and again as circRNAs finish; each miRNA
+    is queried at most once per prefetcher.
+    """
+
+    def __init__(self, limiter=None):
+        self.limiter = limiter or AdaptiveConcurrency()
+        self._executor = ThreadPoolExecutor(max_workers=self.limiter.max_limit, thread_name_prefix="mirdb")
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._futures)
+
+    def submit(self, mirnas):
+        new = 0
+        with self._lock:
+            for mirna in mirnas:
+                if mirna not in self._futures:
+                    self._futures[mirna] = self._executor.submit(query_mirdb_optimized, mirna,
+                                                                 limiter=self.limiter)
+                    new += 1
+        return new
+
+    def results(self, mirnas):
+        """{miRNA: targets} for ``mirnas``, waiting for lookups still in flight."""
+        logger = logging.getLogger()
+        self.submit(mirnas)
+        targets = {}
+        for mirna in mirnas:
+            try:
+                targets[mirna] = self._futures[mirna].result()
+            except Exception as e:
+                logger.error(f"[ERROR] Failed to process {mirna}: {e}")
+                targets[mirna] = []
+        return targets
+
+    def close(self):
+        if self.limiter.requests:
+            logging.getLogger().info("[INFO]  miRDB: %s", self.limiter.summary())
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _matched_mirnas(matches_dir, artifacts=None):
+    if artifacts is not None:
+        matches = artifacts.get_or_load("matches", matches_dir)
+    else:
+        matches = load_artifact_files("matches", matches_dir)
+    if matches is None or matches.empty:
+        raise FileNotFoundError("[ERROR] No circRNA–miRNA matches found")
+    return list(set(matches['mirna_id'].dropna().astype(str).str.strip()))
+
+
+def _load_degs(deg_file):
+    with open(deg_file, 'r', encoding='utf-8') as f:
+        degs = pd.Series(f.readlines()).str.strip().str.upper().drop_duplicates()
+    return degs[degs != '']
+
+
+def _retrieve_targets(mirnas, artifacts=None, prefetcher=None, mirdb_db=None):
+    """miRNA→target table (mirna, gene[, score]), fetched once per run and kept in ``artifacts``."""
+    logger = logging.getLogger()
+    cached = artifacts.get("mirdb_targets") if artifacts is not None else None
+    if cached is not None:
+        # Only miRNAs not retrieved earlier in the run are looked up
+        known = set(cached['mirna'])
+        missing = [m for m in mirnas if m not in known]
+        if not missing:
+            return cached[cached['mirna'].isin(mirnas)]
+        fetched = _retrieve_targets(missing, None, prefetcher, mirdb_db)
+        targets_df = artifacts.put("mirdb_targets", pd.concat([cached, fetched], ignore_index=True))
+        return targets_df[targets_df['mirna'].isin(mirnas)]
+
+    if mirdb_db is not None:
+        start = time.perf_counter()
+        db = mirdb_db if isinstance(mirdb_db, MirdbDatabase) else MirdbDatabase(mirdb_db)
+        targets_df = db.lookup(mirnas)
+        logger.info("[INFO]  miRDB targets for %d miRNAs read from %s in %.3fs",
+                    len(mirnas), db.db_path, time.perf_counter() - start)
+    elif prefetcher is not None:
+        in_flight = len(prefetcher)
+        logger.info("[INFO]  Collecting miRDB targets for %d miRNAs (%d lookups started during step 1)",
+                    len(mirnas), in_flight)
+        mirna_targets = [{'mirna': mirna, 'gene': g}
+                         for mirna, targets in prefetcher.results(mirnas).items() for g in targets]
+        targets_df = pd.DataFrame(mirna_targets, columns=['mirna', 'gene'])
+        logger.info("[INFO]  Completed parallel miRDB queries")
+    else:
+        targets_df = pd.DataFrame(_query_targets(mirnas), columns=['mirna', 'gene'])
+        logger.info("[INFO]  Completed parallel miRDB queries")
+
+    if artifacts is not None:
+        artifacts.put("mirdb_targets", targets_df)
+    return targets_df
+
+
+def _plot_venn(target_genes, degs, venn_path, deg_label="DEGs"):
+    logger = logging.getLogger()
+    logger.info("[INFO] Generating Venn diagram...")
+    target_set = set(target_genes)
+    if submit_plot("venn2", venn_path, sets=[target_set, set(degs)],
+                   set_labels=(f'miRDB ({len(target_set)})', f'{deg_label} ({len(degs)})'),
+                   title="miRDB–DEG Overlap"):
+        logger.info("[INFO] Venn diagram: %s", venn_path)
+
+
+def overlap_mrnas(deg_file, matches_dir='my_output', output_dir='.', artifacts=None, prefetcher=None,
+                  mirdb_db=None):
+    """miRNA–DEG target overlap for the matched miRNAs.
+
+    Matches come from ``artifacts`` when given (in-memory hand-off), else
+    from the per-circRNA match CSVs in ``matches_dir``. The overlap table is
+    stored back into ``artifacts``, or written to ``matches_dir`` without one.
+    With a ``prefetcher``, lookups already started during step 1 are reused.
+    With ``mirdb_db`` (a local database from ``import_mirdb``), targets and
+    their scores are read from it and miRDB is not contacted.
+    """
+    logger = logging.getLogger()
+    os.makedirs(output_dir, exist_ok=True)
+
+    mirnas = _matched_mirnas(matches_dir, artifacts)
+
+    degs = _load_degs(deg_file)
+    logger.info("[INFO] DEGs loaded: %d", len(degs))
+
+    targets_df = _retrieve_targets(mirnas, artifacts, prefetcher, mirdb_db)
+
+    if targets_df.empty:
         logger.error("[ERROR] No miRNA targets found")
+        if artifacts is not None:
+            artifacts.put("overlapping_mrnas", pd.DataFrame(columns=["mirna", "gene"]))
         return pd.DataFrame()
 
-    targets_df = pd.DataFrame(mirna_targets)
     overlapping = targets_df[targets_df['gene'].isin(degs)].drop_duplicates()
     logger.info("[INFO] Overlaps found: %d pairs | %d unique genes", len(overlapping), overlapping['gene'].nunique())
 
-    overlap_path = os.path.join(matches_dir, "overlapping_mrnas.csv")
-    overlapping.to_csv(overlap_path, index=False)
-    logger.info("[INFO] Saved: %s", overlap_path)
+    if artifacts is not None:
+        artifacts.put("overlapping_mrnas", overlapping)
+    else:
+        overlap_path = os.path.join(matches_dir, "overlapping_mrnas.csv")
+        overlapping.to_csv(overlap_path, index=False)
+        logger.info("[INFO] Saved: %s", overlap_path)
 
     logger.info("--------------------------------------------------")
-    logger.info("[INFO] Generating Venn diagram...")
-    plt.figure(figsize=(6, 6))
-    venn = venn2_unweighted(
-        [set(targets_df['gene']), set(degs)],
-        set_labels=(f'miRDB ({len(targets_df["gene"].unique())})', f'DEGs ({len(degs)})'),
-        set_colors=("#FF4C4C", "#4C8CFF"),
-        alpha=0.7
-    )
-
-    plt.title("miRDB–DEG Overlap", fontsize=12, fontweight='bold')
-    venn_path = os.path.join(output_dir, "venn_overlap.png")
-    plt.savefig(venn_path, dpi=400, bbox_inches='tight')
-    plt.close()
-    logger.info("[INFO] Venn diagram saved: %s", venn_path)
+    _plot_venn(targets_df['gene'], degs, os.path.join(output_dir, "venn_overlap.png"))
     logger.info("--------------------------------------------------")
 
     return overlapping
+
+
+def contrast_names(deg_files):
+    """Unique contrast names from DEG file names (file stem, numbered on clashes)."""
+    names = {}
+    for path in deg_files:
+        base = os.path.splitext(os.path.basename(path))[0] or "contrast"
+        name, i = base, 2
+        while name in names:
+            name, i = f"{base}_{i}", i + 1
+        names[name] = path
+    return names
+
+
+def _contrast_column(name):
+    return f"in_{name}"
+
+
+def overlap_mrnas_batch(deg_files, matches_dir='my_output', output_dir='.', artifacts=None, prefetcher=None,
+                        mirdb_db=None):
+    """Overlap the matched miRNAs' targets with many DEG lists (contrasts) at once.
+
+    ``deg_files`` is a list of DEG files or a {contrast: file} mapping.
+    Targets are retrieved once; DEG membership becomes a gene × contrast
+    boolean matrix (``in_<name>`` columns) that is joined to the target
+    table in one pass. Writes ``contrasts/<name>/overlapping_mrnas.csv``
+    and ``venn_overlap.png`` per contrast plus
+    ``contrasts/contrast_overlap_summary.csv``, and returns
+    {contrast: overlapping DataFrame}.
+    """
+    logger = logging.getLogger()
+    contrasts = deg_files if isinstance(deg_files, dict) else contrast_names(deg_files)
+    batch_dir = os.path.join(output_dir, "contrasts")
+    os.makedirs(batch_dir, exist_ok=True)
+
+    mirnas = _matched_mirnas(matches_dir, artifacts)
+    deg_lists = {name: _load_degs(path) for name, path in contrasts.items()}
+    logger.info("[INFO] DEG contrasts loaded: %d (%s)", len(deg_lists),
+                ", ".join(f"{n}: {len(d)}" for n, d in deg_lists.items()))
+
+    # gene × contrast membership matrix; columns are prefixed so that a contrast
+    # called e.g. "gene" or "mirna" cannot collide with the target table
+    membership = pd.concat([pd.DataFrame({"gene": degs.to_numpy(), "contrast": name})
+                            for name, degs in deg_lists.items()], ignore_index=True)
+    deg_matrix = pd.crosstab(membership["gene"], membership["contrast"]).astype(bool)
+    deg_matrix = deg_matrix.reindex(columns=list(deg_lists), fill_value=False)
+    deg_matrix.columns = [_contrast_column(name) for name in deg_matrix.columns]
+
+    targets_df = _retrieve_targets(mirnas, artifacts, prefetcher, mirdb_db).drop_duplicates()
+    hits = targets_df.merge(deg_matrix, left_on="gene", right_index=True, how="inner")
+    hits.to_csv(os.path.join(batch_dir, "contrast_overlap_matrix.csv"), index=False)
+
+    target_genes = targets_df['gene'].unique()
+    overlaps = {}
+    summary = []
+    for name, degs in deg_lists.items():
+        overlapping = hits.loc[hits[_contrast_column(name)], list(targets_df.columns)]
+        overlaps[name] = overlapping
+        contrast_dir = os.path.join(batch_dir, name)
+        os.makedirs(contrast_dir, exist_ok=True)
+        overlapping.to_csv(os.path.join(contrast_dir, "overlapping_mrnas.csv"), index=False)
+        if not targets_df.empty:
+            _plot_venn(target_genes, degs, os.path.join(contrast_dir, "venn_overlap.png"), deg_label=name)
+        summary.append({"contrast": name, "degs": len(degs), "pairs": len(overlapping),
+                        "genes": overlapping['gene'].nunique(), "mirnas": overlapping['mirna'].nunique()})
+
+    summary_df = pd.DataFrame(summary)
+    summary_path = os.path.join(batch_dir, "contrast_overlap_summary.csv")
+    summary_df.to_csv(summary_path, index=False)
+    logger.info("[INFO] Contrast overlaps: %d contrasts, %d target pairs in any contrast (%s)",
+                len(overlaps), len(hits), summary_path)
+    return overlaps
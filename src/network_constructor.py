@@ -1,79 +1,113 @@
 import os
 import networkx as nx
+import numpy as np
 import pandas as pd
 from pyvis.network import Network
 from IPython.display import IFrame, display
 import logging
-
-def construct_circrna_mirna_mrna_network(results, strong_hits, all_mirnas, temp_dir, output_dir):
+from artifact_store import ArtifactStore
+from incidence import CircMirnaIncidence
+from network_layout import compute_layout
+from network_html import write_shared_html
+from network_export import export_network, DEFAULT_FORMATS
+
+NODE_TYPES = ("circRNA", "miRNA", "mRNA")
+
+
+def network_tables(pairs, overlap_df):
+    """Node and edge tables of the regulatory network.
+
+    ``pairs`` has circ_id/mirna_id columns (``CircMirnaIncidence.pairs()``) and
+    ``overlap_df`` mirna/gene columns. Returns ``nodes`` (node, type) in
+    first-seen order and ``edges`` (source, target, interaction) with one row
+    per directed pair; as with repeated ``add_node``/``add_edge`` calls, a
+    later type or interaction wins.
+    """
+    circ_edges = pd.DataFrame({"source": pairs["circ_id"].astype(str), "target": pairs["mirna_id"].astype(str),
+                               "interaction": "circRNA→miRNA"})
+    overlap_df = overlap_df.dropna(subset=["mirna", "gene"])
+    mrna_edges = pd.DataFrame({"source": overlap_df["mirna"].astype(str), "target": overlap_df["gene"].astype(str),
+                               "interaction": "miRNA→mRNA"})
+    edges = (pd.concat([circ_edges, mrna_edges], ignore_index=True)
+             .drop_duplicates(["source", "target"], keep="last")
+             .reset_index(drop=True))
+
+    # Each edge adds its source before its target, as add_edge would; groupby(sort=False)
+    # keeps the first-seen order of nodes and the last type assigned to each
+    nodes = pd.concat([
+        pd.DataFrame({"node": np.column_stack([circ_edges["source"], circ_edges["target"]]).ravel(),
+                      "type": np.tile(["circRNA", "miRNA"], len(circ_edges))}),
+        pd.DataFrame({"node": np.column_stack([mrna_edges["source"], mrna_edges["target"]]).ravel(),
+                      "type": np.tile(["miRNA", "mRNA"], len(mrna_edges))}),
+    ], ignore_index=True)
+    nodes = nodes.groupby("node", sort=False)["type"].last().reset_index()
+    return nodes, edges
+
+
+def construct_circrna_mirna_mrna_network(results, strong_hits, all_mirnas, temp_dir, output_dir, artifacts=None,
+                                         incidence=None, layout_iterations=50, html_mode="inline",
+                                         network_formats=DEFAULT_FORMATS):
     logger = logging.getLogger()
-    G = nx.DiGraph()
     os.makedirs(temp_dir, exist_ok=True)
     os.makedirs(output_dir, exist_ok=True)
 
-    
-    for circ in results.keys():
-        match_file = os.path.join(temp_dir, f"{circ}_strong_medium_matches.csv")
-        if os.path.exists(match_file):
-            try:
-                df = pd.read_csv(match_file)
-                for _, row in df.iterrows():
-                    c, m = row['circ_id'], row['mirna_id']
-                    G.add_node(c, type='circRNA')
-                    G.add_node(m, type='miRNA')
-                    G.add_edge(c, m, interaction='circRNA→miRNA')
-            except Exception as e:
-                logger.error(f"[ERROR] Failed: {match_file} | {e}")
-
-    
-    overlap_file = os.path.join(temp_dir, "overlapping_mrnas.csv")
-    if not os.path.exists(overlap_file):
-        logger.warning("[WARN]  No miRNA–mRNA file found")
-        return None
+    # Stage tables come from the in-memory artifact store, falling back to temp CSVs
+    store = artifacts if artifacts is not None else ArtifactStore()
+    pairs = pd.DataFrame(columns=["circ_id", "mirna_id"])
+    try:
+        if incidence is None:
+            incidence = CircMirnaIncidence.from_sites(store.get_or_load("matches", temp_dir))
+        pairs = incidence.pairs()
+        pairs = pairs[pairs['circ_id'].isin(list(results.keys()))]
+    except Exception as e:
+        logger.error(f"[ERROR] Failed to load circRNA–miRNA matches | {e}")
 
     try:
-        overlap_df = pd.read_csv(overlap_file)
-        for _, row in overlap_df.iterrows():
-            m, g = row['mirna'], row['gene']
-            G.add_node(m, type='miRNA')
-            G.add_node(g, type='mRNA')
-            G.add_edge(m, g, interaction='miRNA→mRNA')
+        overlap_df = store.get_or_load("overlapping_mrnas", temp_dir)
+        if overlap_df is None:
+            logger.warning("[WARN]  No miRNA–mRNA overlap found")
+            return None
+        nodes, edges = network_tables(pairs, overlap_df)
     except Exception as e:
         logger.error("[ERROR]  Overlap load failed: %s", e)
         return None
 
+    # Bulk load: nodes first (keeps their order), then the edge list and its attribute
+    G = nx.DiGraph()
+    G.add_nodes_from(nodes["node"])
+    G.add_edges_from(zip(edges["source"], edges["target"]))
+    nx.set_node_attributes(G, dict(zip(nodes["node"], nodes["type"])), "type")
+    nx.set_edge_attributes(G, dict(zip(zip(edges["source"], edges["target"]), edges["interaction"])), "interaction")
+
+    type_counts = nodes["type"].value_counts()
     logger.info("[INFO]  Network: %d nodes, %d edges (%d circRNAs, %d miRNAs, %d mRNAs)",
-                G.number_of_nodes(), G.number_of_edges(),
-                len([n for n, d in G.nodes(data=True) if d.get('type') == 'circRNA']),
-                len([n for n, d in G.nodes(data=True) if d.get('type') == 'miRNA']),
-                len([n for n, d in G.nodes(data=True) if d.get('type') == 'mRNA']))
+                len(nodes), len(edges), *(int(type_counts.get(t, 0)) for t in NODE_TYPES))
 
 
-    graphml_path = os.path.join(output_dir, "circrna_mirna_mrna_network.graphml")
     try:
-        nx.write_graphml(G, graphml_path)
-        logger.info("[INFO]  GraphML: %s", graphml_path)
+        for path in export_network(G, os.path.join(output_dir, "circrna_mirna_mrna_network"), network_formats):
+            logger.info("[INFO]  Network export: %s", path)
     except Exception as e:
-        logger.error("[ERROR]  GraphML save failed: %s", e)
+        logger.error("[ERROR]  Network export failed: %s", e)
 
     
     
     
     net = Network(height="800px", width="100%", directed=True, notebook=True, cdn_resources="in_line")
 
-    
+    # Positions are computed here and embedded, so the browser does not simulate on load
+    pos = compute_layout(G, iterations=layout_iterations)
     for node, attr in G.nodes(data=True):
         ntype = attr.get('type', 'unknown')
 
         if ntype == 'circRNA':
-            color, shape, size, font_size, physics = 'lightpink', 'diamond', 45, 20, True
+            color, shape, size, font_size = 'lightpink', 'diamond', 45, 20
         elif ntype == 'miRNA':
-            
-            color, shape, size, font_size, physics = 'darkorange', 'triangle', 40, 18, False
+            color, shape, size, font_size = 'darkorange', 'triangle', 40, 18
         elif ntype == 'mRNA':
-            color, shape, size, font_size, physics = 'lightgreen', 'ellipse', 25, 14, True
+            color, shape, size, font_size = 'lightgreen', 'ellipse', 25, 14
         else:
-            color, shape, size, font_size, physics = 'lightgray', 'dot', 20, 12, True
+            color, shape, size, font_size = 'lightgray', 'dot', 20, 12
 
         net.add_node(
             node,
@@ -83,7 +117,9 @@ def construct_circrna_mirna_mrna_network(results, strong_hits, all_mirnas, temp_
             shape=shape,
             size=size,
             font={"size": font_size, "vadjust": 0},
-            physics=physics
+            x=pos[node][0],
+            y=pos[node][1],
+            physics=False
         )
 
     
@@ -110,14 +146,10 @@ def construct_circrna_mirna_mrna_network(results, strong_hits, all_mirnas, temp_
     
     net.set_options("""{
       "physics": {
-        "forceAtlas2Based": {
-          "gravitationalConstant": -50,
-          "centralGravity": 0.01,
-          "springLength": 150,
-          "springConstant": 0.05
-        },
-        "minVelocity": 0.75,
-        "solver": "forceAtlas2Based"
+        "enabled": false
+      },
+      "edges": {
+        "smooth": false
       },
       "interaction": {
         "hover": true,
@@ -141,11 +173,7 @@ def construct_circrna_mirna_mrna_network(results, strong_hits, all_mirnas, temp_
     
     
     html_path = os.path.join(output_dir, "circrna_mirna_mrna_network.html")
-    try:
-        html_str = net.generate_html()
-
-        
-        header_html = """
+    header_html = """
         <div style='text-align:center; font-size:22px; font-weight:bold; padding:10px;'>
             circRNA–miRNA–mRNA Regulatory Network
         </div>
@@ -156,10 +184,14 @@ def construct_circrna_mirna_mrna_network(results, strong_hits, all_mirnas, temp_
             <span style="color:lightgreen; font-weight:bold;">● mRNA</span>
         </div>
         """
-        html_str = header_html + html_str
-
-        with open(html_path, "w", encoding="utf-8") as f:
-            f.write(html_str)
+    try:
+        if html_mode == "shared":
+            write_shared_html(net, html_path, header_html=header_html,
+                              title="circRNA–miRNA–mRNA Regulatory Network")
+        else:
+            html_str = header_html + net.generate_html()
+            with open(html_path, "w", encoding="utf-8") as f:
+                f.write(html_str)
 
         logger.info("[INFO]  HTML saved: %s", html_path)
     except Exception as e:
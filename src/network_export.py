@@ -0,0 +1,193 @@
+import os
+import time
+import logging
+import numpy as np
+import pandas as pd
+import networkx as nx
+from scipy import sparse
+
+# "graphml": nx.write_graphml (interoperable, slow for large graphs)
+# "parquet": <stem>.nodes.parquet + <stem>.edges.parquet (typed node table and edge list)
+# "npz":     <stem>.npz (node arrays plus CSR indptr/indices and per-edge arrays)
+NETWORK_FORMATS = ("graphml", "parquet", "npz")
+DEFAULT_FORMATS = ("graphml", "parquet")
+_DIRECTED_KEY = b"deepregulatorynet.directed"
+
+
+def _is_text(dtype):
+    # object (pandas 2) or the dedicated string dtype (pandas 3)
+    return dtype == object or pd.api.types.is_string_dtype(dtype)
+
+
+def _typed(df):
+    """String columns become categoricals; numeric and boolean columns keep their dtype.
+
+    Object columns mixing value types (e.g. str and int) are stored as text,
+    since Parquet needs one type per column; missing values stay missing.
+    """
+    for col in df.columns:
+        if _is_text(df[col].dtype) and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            values = df[col]
+            if values.dropna().map(type).nunique() > 1:
+                values = values.map(lambda v: v if pd.isna(v) else str(v))
+            df[col] = values.astype("category")
+    return df
+
+
+def network_frames(G):
+    """Node table (``node`` + attributes) and edge list (int32 ``source``/``target`` row indices + attributes)."""
+    nodes = list(G.nodes())
+    index = {node: i for i, node in enumerate(nodes)}
+    node_df = pd.DataFrame([attrs for _, attrs in G.nodes(data=True)], index=range(len(nodes)))
+    node_df.insert(0, "node", pd.Series([str(n) for n in nodes], dtype=object))
+
+    edges = list(G.edges(data=True))
+    edge_df = pd.DataFrame([attrs for _, _, attrs in edges], index=range(len(edges)))
+    edge_df.insert(0, "source", np.fromiter((index[u] for u, _, _ in edges), dtype=np.int32, count=len(edges)))
+    edge_df.insert(1, "target", np.fromiter((index[v] for _, v, _ in edges), dtype=np.int32, count=len(edges)))
+    return _typed(node_df), _typed(edge_df)
+
+
+def _write_parquet(node_df, edge_df, stem, directed):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    node_path, edge_path = f"{stem}.nodes.parquet", f"{stem}.edges.parquet"
+    node_df.to_parquet(node_path, index=False)
+    table = pa.Table.from_pandas(edge_df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_DIRECTED_KEY] = b"true" if directed else b"false"
+    pq.write_table(table.replace_schema_metadata(metadata), edge_path)
+    return [node_path, edge_path]
+
+
+def _npz_arrays(df, prefix, order=None):
+    """``<prefix>__<col>`` arrays, plus a ``<prefix>_missing__<col>`` mask for text columns with gaps.
+
+    Text is stored as fixed-width unicode so the file loads without pickle.
+    """
+    arrays = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype) or _is_text(series.dtype):
+            missing = series.isna().to_numpy()
+            values = np.asarray(series.astype(object).where(~missing, "").astype(str).to_numpy(), dtype=str)
+            if missing.any():
+                arrays[f"{prefix}_missing__{col}"] = missing if order is None else missing[order]
+        else:
+            values = series.to_numpy()
+        arrays[f"{prefix}__{col}"] = values if order is None else values[order]
+    return arrays
+
+
+def _npz_frame(data, prefix, columns=None):
+    """Inverse of ``_npz_arrays``: masked text entries come back as NaN."""
+    frame = pd.DataFrame(columns or {})
+    for key in data.files:
+        if key.startswith(f"{prefix}__"):
+            frame[key[len(prefix) + 2:]] = data[key]
+    for key in data.files:
+        if key.startswith(f"{prefix}_missing__"):
+            col = key[len(prefix) + len("_missing__"):]
+            frame[col] = frame[col].astype(object).where(~data[key], np.nan)
+    return frame
+
+
+def _write_npz(node_df, edge_df, stem, directed):
+    path = f"{stem}.npz"
+    n = len(node_df)
+    # CSR: edges ordered by source row; per-edge arrays follow the same order
+    order = np.argsort(edge_df["source"].to_numpy(), kind="stable")
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(edge_df["source"].to_numpy(), minlength=n))])
+    arrays = {
+        "directed": np.bool_(directed),
+        "indptr": indptr.astype(np.int64),
+        "indices": edge_df["target"].to_numpy()[order].astype(np.int32),
+    }
+    arrays.update(_npz_arrays(node_df, "node"))
+    arrays.update(_npz_arrays(edge_df.drop(columns=["source", "target"]), "edge", order))
+    np.savez_compressed(path, **arrays)
+    return [path]
+
+
+def export_network(G, stem, formats=DEFAULT_FORMATS):
+    """Write ``G`` as ``stem`` + the extension of each requested format; returns the written paths."""
+    logger = logging.getLogger()
+    unknown = [f for f in formats if f not in NETWORK_FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown network format: {', '.join(unknown)}")
+    os.makedirs(os.path.dirname(stem) or ".", exist_ok=True)
+    paths = []
+    frames = None
+    for fmt in formats:
+        start = time.perf_counter()
+        if fmt == "graphml":
+            written = [f"{stem}.graphml"]
+            nx.write_graphml(G, written[0])
+        else:
+            if frames is None:
+                frames = network_frames(G)
+            writer = _write_parquet if fmt == "parquet" else _write_npz
+            written = writer(*frames, stem, G.is_directed())
+        logger.debug(f"[DEBUG] {fmt} export in {time.perf_counter() - start:.2f}s")
+        paths += written
+    return paths
+
+
+def _read(stem):
+    """(node_df, edge_df, directed) from ``stem``.npz or the ``stem``.*.parquet pair."""
+    if stem.endswith(".npz"):
+        stem = stem[:-len(".npz")]
+    if os.path.exists(f"{stem}.npz"):
+        with np.load(f"{stem}.npz") as data:
+            indptr = data["indptr"]
+            node_df = _npz_frame(data, "node")
+            edge_df = _npz_frame(data, "edge", {
+                "source": np.repeat(np.arange(len(indptr) - 1, dtype=np.int32), np.diff(indptr)),
+                "target": data["indices"],
+            })
+            return node_df, edge_df, bool(data["directed"])
+    node_path, edge_path = f"{stem}.nodes.parquet", f"{stem}.edges.parquet"
+    if os.path.exists(node_path) and os.path.exists(edge_path):
+        import pyarrow.parquet as pq
+
+        metadata = pq.read_schema(edge_path).metadata or {}
+        directed = metadata.get(_DIRECTED_KEY, b"false") == b"true"
+        return pd.read_parquet(node_path), pd.read_parquet(edge_path), directed
+    raise FileNotFoundError(f"No npz or parquet network export found for {stem}")
+
+
+def _attr_records(df):
+    # Rows are dicts without the missing cells: an attribute a node or edge never had stays absent
+    return [{k: v for k, v in row.items() if not pd.isna(v)} for row in df.to_dict("records")]
+
+
+def load_network(stem):
+    """Rebuild the NetworkX graph written by ``export_network`` (npz preferred over parquet)."""
+    node_df, edge_df, directed = _read(stem)
+    G = nx.DiGraph() if directed else nx.Graph()
+    ids = node_df["node"].astype(str).to_numpy()
+    node_attrs = node_df.drop(columns="node")
+    G.add_nodes_from(zip(ids, _attr_records(node_attrs)) if len(node_attrs.columns) else ids)
+    edge_attrs = edge_df.drop(columns=["source", "target"])
+    ends = zip(ids[edge_df["source"].to_numpy()], ids[edge_df["target"].to_numpy()])
+    if len(edge_attrs.columns):
+        G.add_edges_from((u, v, attrs) for (u, v), attrs in zip(ends, _attr_records(edge_attrs)))
+    else:
+        G.add_edges_from(ends)
+    return G
+
+
+def load_adjacency(stem, weight="weight"):
+    """(CSR adjacency, node table) from an export; ``weight`` column as values if present, else 1.
+
+    Undirected graphs are stored with each edge once and returned symmetric.
+    """
+    node_df, edge_df, directed = _read(stem)
+    n = len(node_df)
+    data = (edge_df[weight].to_numpy(dtype=np.float64) if weight in edge_df.columns
+            else np.ones(len(edge_df), dtype=np.float64))
+    A = sparse.csr_matrix((data, (edge_df["source"].to_numpy(), edge_df["target"].to_numpy())), shape=(n, n))
+    if not directed:
+        A = A.maximum(A.T).tocsr()
+    return A, node_df
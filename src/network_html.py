@@ -0,0 +1,149 @@
+import os
+import glob
+import gzip
+import json
+import base64
+import shutil
+import logging
+
+# "inline": one self-contained page per network (pyvis embeds vis.js and the data)
+# "shared": vis.js/CSS written once to a shared assets folder, data in a compressed side file
+HTML_MODES = ("inline", "shared")
+ASSETS_DIRNAME = "network_assets"
+
+# Per-element values stored as columns; every other attribute goes into a deduplicated style table
+_NODE_COLUMNS = ("label", "title", "x", "y")
+_EDGE_COLUMNS = ("title",)
+
+_LOADER_JS = """var drnNetwork = {
+  options: {},
+  _rows: function (table, count) {
+    var rows = [];
+    for (var i = 0; i < count; i++) {
+      var row = Object.assign({}, table.styles[table.style[i]]);
+      for (var key in table.columns) {
+        if (table.columns[key][i] !== null) { row[key] = table.columns[key][i]; }
+      }
+      rows.push(row);
+    }
+    return rows;
+  },
+  load: function (encoded) {
+    var bytes = Uint8Array.from(atob(encoded), function (c) { return c.charCodeAt(0); });
+    var stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("gzip"));
+    return new Response(stream).json().then(function (data) {
+      var nodes = drnNetwork._rows(data.nodes, data.nodes.id.length);
+      nodes.forEach(function (node, i) { node.id = data.nodes.id[i]; });
+      var edges = drnNetwork._rows(data.edges, data.edges.from.length);
+      edges.forEach(function (edge, i) {
+        edge.from = data.nodes.id[data.edges.from[i]];
+        edge.to = data.nodes.id[data.edges.to[i]];
+      });
+      return new vis.Network(document.getElementById("network"),
+                             {nodes: new vis.DataSet(nodes), edges: new vis.DataSet(edges)},
+                             drnNetwork.options);
+    });
+  }
+};
+"""
+
+_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<link rel="stylesheet" href="{assets}/vis-network.css">
+<script src="{assets}/vis-network.min.js"></script>
+<script src="{assets}/network_loader.js"></script>
+<style>#network {{ width: {width}; height: {height}; border: 1px solid lightgray; }}</style>
+</head>
+<body>
+{header}
+<div id="network"></div>
+<script>drnNetwork.options = {options};</script>
+<script src="{data_file}"></script>
+</body>
+</html>
+"""
+
+
+def ensure_assets(assets_dir):
+    """Copy vis-network (from the installed pyvis) and the page loader into ``assets_dir`` once."""
+    import pyvis
+
+    os.makedirs(assets_dir, exist_ok=True)
+    lib_dir = os.path.join(os.path.dirname(pyvis.__file__), "templates", "lib")
+    for name in ("vis-network.min.js", "vis-network.css"):
+        target = os.path.join(assets_dir, name)
+        if os.path.exists(target):
+            continue
+        sources = sorted(glob.glob(os.path.join(lib_dir, "vis-*", name)))
+        if not sources:
+            raise FileNotFoundError(f"{name} not found in the pyvis installation ({lib_dir})")
+        shutil.copyfile(sources[-1], target)
+    loader = os.path.join(assets_dir, "network_loader.js")
+    if not os.path.exists(loader):
+        with open(loader, "w", encoding="utf-8") as f:
+            f.write(_LOADER_JS)
+    return assets_dir
+
+
+def _compact(items, columns):
+    """Column arrays for ``columns`` plus a style table shared by elements with equal remaining attributes."""
+    table = {"columns": {key: [] for key in columns}, "styles": [], "style": []}
+    style_index = {}
+    for item in items:
+        for key in columns:
+            value = item.get(key)
+            table["columns"][key].append(round(value, 1) if isinstance(value, float) else value)
+        style = {k: v for k, v in item.items() if k not in columns}
+        key = json.dumps(style, sort_keys=True)
+        if key not in style_index:
+            style_index[key] = len(table["styles"])
+            table["styles"].append(style)
+        table["style"].append(style_index[key])
+    return table
+
+
+def _options_json(net):
+    return json.dumps(net.options) if isinstance(net.options, dict) else net.options.to_json()
+
+
+def write_shared_html(net, html_path, header_html="", title="Network", assets_dir=None):
+    """Write a pyvis ``Network`` as a small page plus ``<name>.data.js`` (gzip + base64 compact arrays).
+
+    The page references vis.js in ``assets_dir`` (default: ``network_assets``
+    next to the page) and works from the local filesystem without network access.
+    """
+    html_dir = os.path.dirname(os.path.abspath(html_path))
+    assets_dir = ensure_assets(assets_dir or os.path.join(html_dir, ASSETS_DIRNAME))
+
+    ids = [node["id"] for node in net.nodes]
+    index = {node_id: i for i, node_id in enumerate(ids)}
+    nodes = _compact([{k: v for k, v in node.items() if k != "id"} for node in net.nodes], _NODE_COLUMNS)
+    nodes["id"] = ids
+    edges = _compact([{k: v for k, v in edge.items() if k not in ("from", "to")} for edge in net.edges],
+                     _EDGE_COLUMNS)
+    edges["from"] = [index[edge["from"]] for edge in net.edges]
+    edges["to"] = [index[edge["to"]] for edge in net.edges]
+
+    payload = json.dumps({"nodes": nodes, "edges": edges}, separators=(",", ":")).encode("utf-8")
+    encoded = base64.b64encode(gzip.compress(payload)).decode("ascii")
+    data_path = os.path.splitext(html_path)[0] + ".data.js"
+    with open(data_path, "w", encoding="utf-8") as f:
+        f.write(f'drnNetwork.load("{encoded}");\n')
+
+    page = _PAGE.format(
+        title=title,
+        assets=os.path.relpath(assets_dir, html_dir).replace(os.sep, "/"),
+        width=net.width,
+        height=net.height,
+        header=header_html,
+        options=_options_json(net),
+        data_file=os.path.basename(data_path),
+    )
+    with open(html_path, "w", encoding="utf-8") as f:
+        f.write(page)
+    logging.getLogger().debug(f"[DEBUG] {html_path}: {len(payload)} bytes of network data, "
+                              f"{os.path.getsize(data_path)} compressed")
+    return html_path
@@ -0,0 +1,96 @@
+import time
+import logging
+import numpy as np
+import networkx as nx
+from scipy import sparse
+from scipy.sparse.linalg import eigsh, ArpackError
+
+# Above this many nodes the O(n²) repulsion is skipped and the spectral layout is used as is
+FORCE_NODE_LIMIT = 5000
+# Upper bound on the (chunk × n × 2) float64 block used for repulsion
+_BLOCK_ELEMENTS = 4_000_000
+
+
+def _adjacency(G, nodes):
+    """Symmetric, unweighted CSR adjacency without self-loops."""
+    A = nx.to_scipy_sparse_array(G, nodelist=nodes, weight=None, format="csr")
+    A = sparse.csr_matrix(A)
+    A = ((A + A.T) > 0).astype(np.float64)
+    A = A - sparse.diags(A.diagonal())
+    A.eliminate_zeros()
+    return sparse.csr_matrix(A)
+
+
+def _spectral(A, rng):
+    """Two leading non-trivial eigenvectors of the normalized adjacency, scaled to [0, 1]."""
+    n = A.shape[0]
+    deg = np.asarray(A.sum(axis=1)).ravel()
+    d = 1.0 / np.sqrt(np.where(deg > 0, deg, 1.0))
+    M = sparse.diags(d) @ A @ sparse.diags(d)
+    try:
+        if n < 500:
+            _, vecs = np.linalg.eigh(M.toarray())
+            pos = vecs[:, -3:-1]
+        else:
+            _, vecs = eigsh(M, k=3, which="LA", tol=1e-4, maxiter=n * 10)
+            pos = vecs[:, :2]
+    except (ArpackError, np.linalg.LinAlgError, ValueError):
+        pos = rng.random((n, 2))
+    # Disconnected parts and isolated nodes collapse onto a point; jitter separates them
+    pos = pos + rng.normal(scale=1e-3, size=pos.shape)
+    span = pos.max(axis=0) - pos.min(axis=0)
+    return (pos - pos.min(axis=0)) / np.where(span > 0, span, 1.0)
+
+
+def _force_directed(A, pos, iterations):
+    """Fruchterman–Reingold on the whole array: chunked repulsion, edge-list attraction."""
+    n = len(pos)
+    k = 1.0 / np.sqrt(n)
+    coo = A.tocoo()
+    rows, cols = coo.row, coo.col
+    chunk = max(1, _BLOCK_ELEMENTS // (2 * n))
+    t0 = 0.1
+    for it in range(iterations):
+        disp = np.zeros_like(pos)
+        for start in range(0, n, chunk):
+            delta = pos[start:start + chunk, None, :] - pos[None, :, :]
+            dist2 = np.maximum((delta ** 2).sum(axis=-1), 1e-9)
+            disp[start:start + chunk] += (delta * (k * k / dist2)[..., None]).sum(axis=1)
+        delta = pos[rows] - pos[cols]
+        pull = delta * (np.sqrt((delta ** 2).sum(axis=1)) / k)[:, None]
+        # A is symmetric, so every edge pulls both of its ends
+        disp[:, 0] -= np.bincount(rows, pull[:, 0], minlength=n)
+        disp[:, 1] -= np.bincount(rows, pull[:, 1], minlength=n)
+        length = np.maximum(np.sqrt((disp ** 2).sum(axis=1)), 1e-9)
+        step = t0 * (1.0 - it / iterations)
+        pos += disp * (np.minimum(length, step) / length)[:, None]
+    return pos
+
+
+def compute_layout(G, iterations=50, scale=1000.0, seed=42):
+    """Node positions {node: (x, y)} for embedding in a pyvis page with physics off.
+
+    Starts from a spectral layout and refines it with at most ``iterations``
+    force-directed steps (skipped above ``FORCE_NODE_LIMIT`` nodes). The
+    result is deterministic for a given graph and ``seed`` and spans
+    roughly ±``scale`` pixels.
+    """
+    logger = logging.getLogger()
+    start = time.perf_counter()
+    nodes = list(G.nodes())
+    n = len(nodes)
+    if n == 0:
+        return {}
+    if n == 1:
+        return {nodes[0]: (0.0, 0.0)}
+
+    rng = np.random.default_rng(seed)
+    A = _adjacency(G, nodes)
+    pos = _spectral(A, rng)
+    if iterations and n <= FORCE_NODE_LIMIT:
+        pos = _force_directed(A, pos, iterations)
+
+    pos -= pos.mean(axis=0)
+    pos *= scale / max(np.abs(pos).max(), 1e-9)
+    logger.debug(f"[DEBUG] Layout for {n} nodes, {A.nnz // 2} edges in {time.perf_counter() - start:.2f}s")
+    return {node: (float(x), float(y)) for node, (x, y) in zip(nodes, pos)}
@@ -0,0 +1,286 @@
+import os
+import json
+import time
+import uuid
+import queue
+import shutil
+import logging
+import threading
+import traceback
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from data_grabber import DataGrabber
+from predictor import Predictor
+from prediction_atlas import PredictionAtlas, model_artifact_hash
+from second_pipeline import SecondPipeline
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a job is submitted while the service queue is at capacity."""
+    pass
+
+
+class PipelineService:
+    """Keeps the model, HTTP sessions and caches warm and runs jobs from a bounded queue.
+
+    Each job gets its own ``jobs_dir/<job_id>/{temp,output}`` folders. Step 1
+    (fetch + predict) runs concurrently across workers; the downstream steps
+    share matplotlib state and are run one job at a time. Finished jobs are
+    forgotten, and their folders deleted, once there are more than
+    ``max_finished_jobs`` of them or they are older than ``job_ttl`` seconds.
+    """
+
+    def __init__(self, model_file, encoder_file, scaler_file, jobs_dir="jobs",
+                 data_dir=None, atlas_dir=None, workers=2, queue_size=32, max_concurrency=8, mirdb_db=None,
+                 html_mode="inline", network_formats=("graphml", "parquet"),
+                 max_finished_jobs=100, job_ttl=7 * 24 * 3600):
+        self.logger = logging.getLogger()
+        self.model_file = model_file
+        self.encoder_file = encoder_file
+        self.scaler_file = scaler_file
+        self.jobs_dir = jobs_dir
+        self.data_dir = data_dir
+        self.mirdb_db = mirdb_db
+        self.html_mode = html_mode
+        self.network_formats = network_formats
+        os.makedirs(jobs_dir, exist_ok=True)
+
+        self.predictor = Predictor(model_file, encoder_file, scaler_file)
+        self.grabber = DataGrabber(data_dir or os.path.join(jobs_dir, "cache"), max_concurrency=max_concurrency)
+        self.grabber.migrate_excel_cache()
+        self.atlas = PredictionAtlas(atlas_dir, model_artifact_hash(self.predictor)) if atlas_dir else None
+
+        self.jobs = {}
+        self.max_finished_jobs = max_finished_jobs
+        self.job_ttl = job_ttl
+        self._jobs_lock = threading.Lock()
+        self._downstream_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._workers = [threading.Thread(target=self._worker, name=f"pipeline-worker-{i}", daemon=True)
+                         for i in range(max(1, workers))]
+
+    def start(self):
+        # Pay the import and model-load costs once, before the first job
+        start = time.perf_counter()
+        if self.predictor.evaluator is None:
+            _ = self.predictor.model
+        _ = self.predictor.class_names
+        from enrichment_script import run_enrichment_pipeline  # noqa: F401
+        from ppi_script import PPI_Analysis  # noqa: F401
+        self.logger.info("[INFO] Service warm-up done in %.2fs", time.perf_counter() - start)
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, circ_ids, mirna_ids, deg_ids, enrichment=True, ppi=True):
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        inputs = {}
+        for name, ids in (("circ", circ_ids), ("mirna", mirna_ids), ("deg", deg_ids)):
+            path = os.path.join(job_dir, f"{name}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\n".join(ids) + "\n")
+            inputs[name] = path
+
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "submitted": datetime.now().isoformat(timespec="seconds"),
+            "dir": job_dir,
+            "inputs": inputs,
+            "options": {"enrichment": enrichment, "ppi": ppi},
+        }
+        with self._jobs_lock:
+            self.jobs[job_id] = job
+        try:
+            self._queue.put_nowait(job_id)
+        except queue.Full:
+            with self._jobs_lock:
+                del self.jobs[job_id]
+            raise QueueFullError(f"Job queue is full ({self._queue.maxsize} jobs)")
+        self.logger.info("[INFO] Job %s queued (%d circRNAs, %d miRNAs, %d DEGs)",
+                         job_id, len(circ_ids), len(mirna_ids), len(deg_ids))
+        return job_id
+
+    def status(self, job_id):
+        with self._jobs_lock:
+            job = self.jobs.get(job_id)
+            return None if job is None else {k: v for k, v in job.items() if k not in ("inputs", "finished_at")}
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def job_count(self):
+        with self._jobs_lock:
+            return len(self.jobs)
+
+    def _update(self, job_id, **fields):
+        with self._jobs_lock:
+            self.jobs[job_id].update(fields)
+
+    def _evict_finished(self):
+        """Drop finished jobs beyond ``max_finished_jobs`` or older than ``job_ttl``, with their folders."""
+        now = time.time()
+        with self._jobs_lock:
+            finished = sorted((job for job in self.jobs.values() if "finished_at" in job),
+                              key=lambda job: job["finished_at"])
+            excess = max(0, len(finished) - self.max_finished_jobs) if self.max_finished_jobs is not None else 0
+            expired = [job for i, job in enumerate(finished)
+                       if i < excess or (self.job_ttl is not None and now - job["finished_at"] > self.job_ttl)]
+            for job in expired:
+                del self.jobs[job["id"]]
+        for job in expired:
+            shutil.rmtree(job["dir"], ignore_errors=True)
+        if expired:
+            self.logger.info("[INFO] Evicted %d finished jobs", len(expired))
+
+    def _worker(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                self._update(job_id, status="running", started=datetime.now().isoformat(timespec="seconds"))
+                with self._jobs_lock:
+                    job = dict(self.jobs[job_id])
+                start = time.perf_counter()
+                summary = self._run_job(job)
+                self._update(job_id, status="done", summary=summary,
+                             runtime_s=round(time.perf_counter() - start, 2))
+                self.logger.info("[INFO] Job %s done in %.1fs", job_id, time.perf_counter() - start)
+            except Exception as e:
+                self._update(job_id, status="failed", error=str(e))
+                self.logger.error("[ERROR] Job %s failed: %s", job_id, e)
+                self.logger.debug(traceback.format_exc())
+            finally:
+                self._update(job_id, finished_at=time.time())
+                self._evict_finished()
+                self._queue.task_done()
+
+    def _run_job(self, job):
+        from enrichment_script import run_enrichment_pipeline
+        from ppi_script import PPI_Analysis
+
+        temp_dir = os.path.join(job["dir"], "temp")
+        output_dir = os.path.join(job["dir"], "output")
+        inputs = job["inputs"]
+        pipe = SecondPipeline(
+            inputs["circ"], inputs["mirna"], inputs["deg"],
+            self.model_file, self.encoder_file, self.scaler_file,
+            temp_dir, output_dir,
+            data_dir=self.data_dir,
+            predictor=self.predictor,
+            grabber=self.grabber,
+            atlas=self.atlas,
+            mirdb_db=self.mirdb_db,
+            html_mode=self.html_mode,
+            network_formats=self.network_formats,
+        )
+        first = pipe.first_pipeline
+        try:
+            results = first.process_all_circs()
+            summary = {
+                "circrnas": len(results),
+                "sites": int(sum(len(df) for df in results.values())),
+                "failed_circrnas": list(first.failed_circs),
+                "output_dir": output_dir,
+            }
+
+            with self._downstream_lock:
+                strong, allstrong = first.find_strong_hits(results)
+                first.match_mirnas(results, strong, allstrong)
+                overlap_df = first.analyze_mrna_overlap()
+                genes = []
+                if overlap_df is not None and not overlap_df.empty:
+                    pipe.create_comprehensive_excel()
+                    first.construct_network(results, strong, allstrong)
+                    genes = pipe.extract_overlapping_genes() or []
+                summary["overlapping_genes"] = len(genes)
+
+                if genes and job["options"]["enrichment"]:
+                    run_enrichment_pipeline(
+                        genes,
+                        temp_dir=os.path.join(output_dir, "enrichment_results", "temp"),
+                        output_dir=os.path.join(output_dir, "enrichment_results"),
+                    )
+                overlapping_path = os.path.join(output_dir, "overlapping_genes.csv")
+                if genes and job["options"]["ppi"] and os.path.exists(overlapping_path):
+                    PPI_Analysis(overlapping_path, res_dir=output_dir, html_mode=self.html_mode,
+                                 network_formats=self.network_formats)
+        finally:
+            # Stops step-1 miRDB fetch threads if a stage failed before the overlap
+            first.close_prefetcher()
+        return summary
+
+
+def _make_handler(service):
+    class ServiceHandler(BaseHTTPRequestHandler):
+        def _send(self, code, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok", "queued": service.queue_depth(), "jobs": service.job_count()})
+            elif self.path.startswith("/jobs/"):
+                job = service.status(self.path[len("/jobs/"):])
+                if job is None:
+                    self._send(404, {"error": "unknown job"})
+                else:
+                    self._send(200, job)
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/jobs":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                ids = {k: [str(x).strip() for x in payload.get(k, []) if str(x).strip()]
+                       for k in ("circ", "mirna", "deg")}
+                missing = [k for k, v in ids.items() if not v]
+                if missing:
+                    self._send(400, {"error": f"missing or empty: {', '.join(missing)}"})
+                    return
+                bad = [c for c in ids["circ"] if not c.startswith("hsa_circ_")]
+                bad += [m for m in ids["mirna"] if not m.startswith("hsa-miR")]
+                if bad:
+                    self._send(400, {"error": f"invalid IDs: {', '.join(bad[:10])}"})
+                    return
+                job_id = service.submit(ids["circ"], ids["mirna"], ids["deg"],
+                                        enrichment=bool(payload.get("enrichment", True)),
+                                        ppi=bool(payload.get("ppi", True)))
+                self._send(202, {"job_id": job_id, "status": "queued"})
+            except QueueFullError as e:
+                self._send(503, {"error": str(e)})
+            except (ValueError, TypeError) as e:
+                self._send(400, {"error": f"bad request: {e}"})
+
+        def log_message(self, format, *args):
+            logging.getLogger().debug("[DEBUG] HTTP %s", format % args)
+
+    return ServiceHandler
+
+
+def serve(service, host="127.0.0.1", port=8765):
+    """Start the workers and serve the JSON API until interrupted.
+
+    POST /jobs      {"circ": [...], "mirna": [...], "deg": [...], "enrichment": true, "ppi": true}
+    GET  /jobs/<id> job status and summary
+    GET  /health    queue depth
+    """
+    logger = logging.getLogger()
+    service.start()
+    httpd = ThreadingHTTPServer((host, port), _make_handler(service))
+    logger.info("[INFO] DeepRegulatoryNet service listening on http://%s:%d", host, port)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("[INFO] Service stopped")
+    finally:
+        httpd.server_close()
@@ -0,0 +1,179 @@
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# How figures are produced:
+#   "inline":   rendered immediately by the calling stage (library default)
+#   "deferred": queued to a background process pool; finish() waits for them
+#   "none":     skipped
+PLOT_MODES = ("none", "deferred", "inline")
+
+_settings = {"mode": "inline", "dpi": None, "workers": 2}
+_pool = None
+_futures = []
+_lock = threading.Lock()
+
+
+def _use_agg():
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+# ---------- Renderers (run in the pool, so module-level and picklable by name) ----------
+
+def _render_site_type_pie(path, dpi, sizes, labels, title):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(5, 5))
+    ax.pie(sizes, labels=labels, autopct="%1.1f%%", colors=["#66c2a5", "#fc8d62"], startangle=90)
+    ax.set_title(title)
+    fig.savefig(path, dpi=dpi)
+    plt.close(fig)
+
+
+def _render_venn2(path, dpi, sets, set_labels, title):
+    import warnings
+    import matplotlib.pyplot as plt
+    from matplotlib_venn import venn2_unweighted
+
+    warnings.filterwarnings("ignore", category=UserWarning, module="matplotlib_venn")
+    fig = plt.figure(figsize=(6, 6))
+    venn2_unweighted(sets, set_labels=set_labels, set_colors=("#FF4C4C", "#4C8CFF"), alpha=0.7)
+    plt.title(title, fontsize=12, fontweight='bold')
+    fig.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+
+
+def _render_enrichment_bubble(path, dpi, plot_df, title):
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(8, 6))
+    scatter = plt.scatter(
+        x=plot_df['Enrichment Factor'],
+        y=plot_df['Term'],
+        s=plot_df['Gene Count'] * 20,   # bubble size
+        c=plot_df['-log10(p)'],         # color = significance
+        cmap='viridis',
+        alpha=0.8
+    )
+    plt.colorbar(scatter, label='-log10(Adjusted P-value)')
+    plt.xlabel("Enrichment Factor")
+    plt.ylabel("Terms")
+    plt.title(title)
+    plt.grid(True)
+    plt.tight_layout()
+    fig.savefig(path, dpi=dpi)
+    plt.close(fig)
+
+
+def _render_potency_heatmap(path, dpi, values, annot, title):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig = plt.figure(figsize=(18, 8))
+    sns.heatmap(values,
+                annot=annot,
+                fmt="",
+                cmap='YlGnBu',
+                cbar_kws={'label': 'pIC50 Potency'},
+                annot_kws={"size": 9})
+    plt.title(title, fontsize=16)
+    plt.xlabel('Drug Rank (by pIC50)', fontsize=12)
+    plt.ylabel('Target Gene', fontsize=12)
+    plt.tight_layout()
+    fig.savefig(path, dpi=dpi)
+    plt.close(fig)
+
+
+RENDERERS = {
+    "site_type_pie": (_render_site_type_pie, 100),
+    "venn2": (_render_venn2, 400),
+    "enrichment_bubble": (_render_enrichment_bubble, 300),
+    "potency_heatmap": (_render_potency_heatmap, 300),
+}
+
+
+def _render(kind, path, dpi, data):
+    start = time.perf_counter()
+    func, _ = RENDERERS[kind]
+    func(path, dpi, **data)
+    return path, time.perf_counter() - start
+
+
+# ---------- Public API ----------
+
+def configure(mode="inline", dpi=None, workers=2):
+    """Set the plot mode (none|deferred|inline), a DPI override for every figure, and pool size.
+
+    Inline mode switches this process to the Agg backend here, once; without
+    ``configure()`` inline figures use whatever backend the caller set.
+    Figures already queued are unaffected; call ``finish()`` to wait for them.
+    """
+    if mode not in PLOT_MODES:
+        raise ValueError(f"Unknown plot mode: {mode} (expected one of {', '.join(PLOT_MODES)})")
+    if mode == "inline":
+        _use_agg()
+    _settings.update(mode=mode, dpi=dpi, workers=max(1, int(workers)))
+
+
+def settings():
+    return dict(_settings)
+
+
+def submit_plot(kind, path, **data):
+    """Emit a figure: ``kind`` names a renderer, ``data`` its arguments (must be picklable).
+
+    Returns the output path, or None when plots are disabled.
+    """
+    global _pool
+    logger = logging.getLogger()
+    if kind not in RENDERERS:
+        raise KeyError(f"Unknown plot kind: {kind}")
+    mode = _settings["mode"]
+    if mode == "none":
+        logger.debug(f"[DEBUG] Plot skipped (--plots none): {path}")
+        return None
+    dpi = _settings["dpi"] or RENDERERS[kind][1]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if mode == "inline":
+        _render(kind, path, dpi, data)
+        return path
+
+    with _lock:
+        if _pool is None:
+            # spawn: the pipeline has live threads (HTTP, miRDB) that must not be forked
+            _pool = ProcessPoolExecutor(max_workers=_settings["workers"],
+                                        mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_use_agg)
+        _futures.append((path, _pool.submit(_render, kind, path, dpi, data)))
+    logger.debug(f"[DEBUG] Plot queued: {path}")
+    return path
+
+
+def finish():
+    """Wait for queued figures and shut the pool down; returns (rendered, failed) counts."""
+    global _pool
+    logger = logging.getLogger()
+    with _lock:
+        pending = list(_futures)
+        _futures.clear()
+        pool, _pool = _pool, None
+    if pool is None:
+        return 0, 0
+    start = time.perf_counter()
+    rendered = failed = 0
+    for path, future in pending:
+        try:
+            _, seconds = future.result()
+            rendered += 1
+            logger.debug(f"[DEBUG] Rendered {path} in {seconds:.2f}s")
+        except Exception as e:
+            failed += 1
+            logger.error("[ERROR] Plot rendering failed for %s: %s", path, e)
+    pool.shutdown()
+    logger.info("[INFO] Rendered %d deferred plots (%d failed); waited %.1fs at the end of the run",
+                rendered, failed, time.perf_counter() - start)
+    return rendered, failed
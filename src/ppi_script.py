@@ -6,6 +6,9 @@ from io import StringIO
 from pyvis.network import Network
 from pathlib import Path
 import logging
+from network_layout import compute_layout
+from network_html import write_shared_html
+from network_export import export_network, DEFAULT_FORMATS
 import urllib3
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -35,8 +38,9 @@ def gene_path(gene_path):
 
 
 class PPI_Network:
-    def __init__(self, result_dir):
+    def __init__(self, result_dir, network_formats=DEFAULT_FORMATS):
         self.result_dir = result_dir
+        self.network_formats = network_formats
         os.makedirs(result_dir, exist_ok=True)
 
     def get_string_data(self, gene_list, taxon_id="9606", min_confidence=700):
@@ -75,11 +79,10 @@ class PPI_Network:
             except pd.errors.EmptyDataError:
                 logger.warning("[WARN]  No interactions from STRING API")
 
-        graphml_file = os.path.join(self.result_dir, "ppi_network.graphml")
         try:
-            nx.write_graphml(Graph, graphml_file)
-            logger.info("[INFO]  GraphML: %s", graphml_file)
-        except OSError as e:
+            for path in export_network(Graph, os.path.join(self.result_dir, "ppi_network"), self.network_formats):
+                logger.info("[INFO]  Network export: %s", path)
+        except (OSError, ImportError, ValueError, TypeError) as e:
             logger.error("[ERROR]  Error saving PPI network: %s", e)
         return Graph
 
@@ -113,7 +116,8 @@ class PPI_Network:
             nodes_to_keep.update(ppi_graph.neighbors(hub))
         return ppi_graph.subgraph(nodes_to_keep).copy()
 
-    def render_network(self, ppi_graph, imp_genes, html_file, title="Protein–Protein Interaction (PPI) Network"):
+    def render_network(self, ppi_graph, imp_genes, html_file, title="Protein–Protein Interaction (PPI) Network",
+                       layout_iterations=50, html_mode="inline"):
         
         logger = logging.getLogger()
         if not ppi_graph.nodes():
@@ -129,14 +133,10 @@ class PPI_Network:
         )
 
         
-        vis_network.force_atlas_2based(
-            gravity=-30,
-            central_gravity=0.01,
-            spring_length=100,
-            spring_strength=0.05,
-            damping=0.9,
-            overlap=0
-        )
+        # Layout is precomputed and embedded with physics off, so large networks open instantly
+        vis_network.toggle_physics(False)
+        vis_network.set_edge_smooth("continuous")
+        pos = compute_layout(ppi_graph, iterations=layout_iterations)
 
         
         for node_id in ppi_graph.nodes():
@@ -151,7 +151,10 @@ class PPI_Network:
                 label=node_id if node_id in imp_genes else "",
                 color=node_color,
                 size=20,
-                title=f"{node_id}\nDegree: {ppi_graph.degree(node_id)}"
+                title=f"{node_id}\nDegree: {ppi_graph.degree(node_id)}",
+                x=pos[node_id][0],
+                y=pos[node_id][1],
+                physics=False
             )
 
         
@@ -163,8 +166,6 @@ class PPI_Network:
 
         html_path = str(Path(html_file))
         try:
-            vis_html = vis_network.generate_html(notebook=True)
-
             # Inject Title + Legend
             legend_html = f"""
             <div style="text-align:center; font-family:Arial; margin-bottom:10px;">
@@ -175,10 +176,14 @@ class PPI_Network:
                 </div>
             </div>
             """
-            vis_html = vis_html.replace("<body>", f"<body>{legend_html}", 1)
+            if html_mode == "shared":
+                write_shared_html(vis_network, html_file, header_html=legend_html, title=title)
+            else:
+                vis_html = vis_network.generate_html(notebook=True)
+                vis_html = vis_html.replace("<body>", f"<body>{legend_html}", 1)
 
-            with open(html_file, "w", encoding="utf-8") as file_handle:
-                file_handle.write(vis_html)
+                with open(html_file, "w", encoding="utf-8") as file_handle:
+                    file_handle.write(vis_html)
 
             logger.info("[INFO]  HTML with title and legend: %s", html_file)
         except (OSError, UnicodeEncodeError) as vis_error:
@@ -194,14 +199,14 @@ class PPI_Network:
                 logger.error("[ERROR]  Failed to display PPI network: %s", str(e))
 
 
-def PPI_Analysis(gene_csv_file, min_conf=700, hub_only=True):
+def PPI_Analysis(gene_csv_file, min_conf=700, hub_only=True, res_dir="output", html_mode="inline",
+                 network_formats=DEFAULT_FORMATS):
     logger = logging.getLogger()
     gene_name = gene_path(gene_csv_file)
     if not gene_name:
         logger.error("[ERROR]  No genes loaded")
         return
-    res_dir = "output"
-    ppi_builder = PPI_Network(res_dir)
+    ppi_builder = PPI_Network(res_dir, network_formats=network_formats)
     network_graph = ppi_builder.construct_network(gene_name, min_confidence=min_conf)
     if not network_graph.nodes():
         logger.error("[ERROR]  No network built")
@@ -214,4 +219,4 @@ def PPI_Analysis(gene_csv_file, min_conf=700, hub_only=True):
     if hub_only and hub_gene_name:
         graph_to_render = ppi_builder.extract_hub_subgraph(network_graph, hub_gene_name)
 
-    ppi_builder.render_network(graph_to_render, hub_gene_name, None)
\ No newline at end of file
+    ppi_builder.render_network(graph_to_render, hub_gene_name, None, html_mode=html_mode)
\ No newline at end of file
@@ -0,0 +1,151 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+import pandas as pd
+from data_grabber import DataGrabber, CircInteractomeUnavailableError, HAS_PYARROW
+from data_prepper import DataPrepper
+from model_artifacts import file_sha256
+from site_schema import attach_predictions, strong_sites
+
+ATLAS_INDEX = "index.json"
+
+
+def model_artifact_hash(predictor):
+    """Short hash identifying the model artifacts a prediction came from."""
+    digest = hashlib.sha256()
+    for path in (predictor.evaluator_file, predictor.model_file, predictor.encoder_file, predictor.scaler_file):
+        if path and os.path.exists(path):
+            digest.update(file_sha256(path).encode())
+    return digest.hexdigest()[:16]
+
+
+class PredictionAtlas:
+    """On-disk store of strong/medium predicted sites keyed by (circ ID, model hash).
+
+    Each model hash has its own directory with one table per circRNA and
+    an index; circRNAs with no strong/medium sites are indexed too, so
+    they count as hits. The index is rewritten every ``flush_every`` puts;
+    call ``flush()`` after the last one.
+    """
+
+    def __init__(self, atlas_dir, model_hash, flush_every=500):
+        self.model_hash = model_hash
+        self.root = os.path.join(atlas_dir, model_hash)
+        os.makedirs(self.root, exist_ok=True)
+        self._index_path = os.path.join(self.root, ATLAS_INDEX)
+        self._lock = threading.Lock()
+        self.flush_every = max(1, int(flush_every))
+        self._unflushed = 0
+        self.index = {}
+        if os.path.exists(self._index_path):
+            with open(self._index_path, encoding="utf-8") as f:
+                self.index = json.load(f)
+
+    def __contains__(self, circ_id):
+        return circ_id in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def get(self, circ_id):
+        """Return the stored sites (empty frame if none), or None when not in the atlas."""
+        entry = self.index.get(circ_id)
+        if entry is None:
+            return None
+        if not entry["file"]:
+            return pd.DataFrame()
+        path = os.path.join(self.root, entry["file"])
+        try:
+            return pd.read_parquet(path) if path.endswith(".parquet") else pd.read_pickle(path)
+        except Exception:
+            return None
+
+    def put(self, circ_id, sites):
+        name = None
+        if sites is not None and not sites.empty:
+            name = f"{circ_id}.parquet" if HAS_PYARROW else f"{circ_id}.pkl"
+            path = os.path.join(self.root, name)
+            # Unique temporary name, then an atomic rename: concurrent jobs scoring the
+            # same circRNA never interleave writes and readers never see a partial file
+            tmp = self._tmp_path(path)
+            try:
+                if HAS_PYARROW:
+                    sites.to_parquet(tmp, index=False)
+                else:
+                    sites.to_pickle(tmp)
+                os.replace(tmp, path)
+            except Exception:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+        with self._lock:
+            self.index[circ_id] = {"file": name, "sites": 0 if sites is None else int(len(sites))}
+            self._unflushed += 1
+            due = self._unflushed >= self.flush_every
+        if due:
+            self.flush()
+
+    @staticmethod
+    def _tmp_path(path):
+        return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def flush(self):
+        with self._lock:
+            self._unflushed = 0
+            tmp = self._tmp_path(self._index_path)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.index, f, sort_keys=True)
+            os.replace(tmp, self._index_path)
+
+
+def build_atlas(circ_ids, atlas_dir, predictor, data_dir="temp", max_concurrency=8, chunk_size=500):
+    """Score ``circ_ids`` once into the atlas for ``predictor``'s artifacts.
+
+    circRNAs already present are skipped; work proceeds in chunks so the
+    index is saved regularly and an interrupted build can be resumed.
+    """
+    logger = logging.getLogger()
+    atlas = PredictionAtlas(atlas_dir, model_artifact_hash(predictor))
+    grabber = DataGrabber(data_dir, max_concurrency=max_concurrency)
+    grabber.migrate_excel_cache()
+    prepper = DataPrepper()
+    todo = [c for c in dict.fromkeys(circ_ids) if c not in atlas]
+    logger.info("[INFO] Atlas %s: %d circRNAs stored, %d to score", atlas.root, len(atlas), len(todo))
+
+    # Fetch failures, unparseable tables and failed predictions are retried on the next build;
+    # only circRNAs whose site table is genuinely empty are stored as "no sites"
+    unscored = []
+    for start in range(0, len(todo), chunk_size):
+        chunk = todo[start:start + chunk_size]
+        fetched = grabber.fetch_many(chunk, return_errors=True)
+        cleaned = {}
+        for circ in chunk:
+            data = fetched.get(circ)
+            if data is None or isinstance(data, CircInteractomeUnavailableError):
+                unscored.append(circ)
+                continue
+            if data.empty:
+                atlas.put(circ, None)
+                continue
+            features, full_data = prepper.clean(data, None)
+            if features is None:
+                unscored.append(circ)
+                continue
+            cleaned[circ] = (features, full_data)
+
+        predictions = predictor.predict_batch({c: f for c, (f, _) in cleaned.items()})
+        for circ, (_, full_data) in cleaned.items():
+            if circ not in predictions:
+                unscored.append(circ)
+                continue
+            attach_predictions(full_data, *predictions[circ], predictor.class_names)
+            atlas.put(circ, strong_sites(full_data))
+        atlas.flush()
+        logger.info("[INFO] Atlas progress: %d/%d circRNAs", min(start + chunk_size, len(todo)), len(todo))
+
+    if unscored:
+        logger.warning("[WARN] %d circRNAs not scored (fetch failed or CircInteractome unavailable); "
+                       "rerun to resume", len(unscored))
+    return atlas
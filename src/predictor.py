@@ -1,6 +1,8 @@
 import os
 import logging
-import pickle
+import threading
+from model_artifacts import load_artifact, resolve_model_file, verify_artifact
+from tree_evaluator import evaluator_path
 
 class Predictor:
     FEATURE_COLS = [
@@ -15,8 +17,12 @@ class Predictor:
     def __init__(self,
                  model_file=None,
                  encoder_file=None,
-                 scaler_file=None):
+                 scaler_file=None,
+                 single_pass=True,
+                 evaluator_file=None):
         self.logger = logging.getLogger()
+        # Derive labels from predict_proba instead of evaluating the ensemble twice
+        self.single_pass = single_pass
 
         # Default to CatBoost artifacts saved in the project-level
         # "trained models" directory.
@@ -29,42 +35,92 @@ class Predictor:
         if scaler_file is None:
             scaler_file = os.path.join(models_dir, "scaler.pkl")
 
-        if not os.path.exists(model_file):
-            raise FileNotFoundError(f"Model file not found: {model_file}")
+        self.model_file = resolve_model_file(model_file)
+        self.encoder_file = encoder_file
+        self.scaler_file = scaler_file
+        # Optional pure-NumPy tree export; when present catboost/sklearn are never loaded
+        if evaluator_file is None and os.path.exists(evaluator_path(model_file)):
+            evaluator_file = evaluator_path(model_file)
+        self.evaluator_file = evaluator_file
+        # Only the artifact of the backend in use has to exist
+        required = evaluator_file or self.model_file
+        if not os.path.exists(required):
+            kind = "Evaluator" if evaluator_file else "Model"
+            raise FileNotFoundError(f"{kind} file not found: {required}")
+
+        # Artifacts are loaded on first use, not at construction
+        self._evaluator = None
+        self._model = None
+        self._encoder = None
+        self._scaler = None
+        self._aux_loaded = False
+        # Service worker threads share one Predictor: load each artifact once
+        self._load_lock = threading.RLock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    try:
+                        self._model = load_artifact(self.model_file, "model")
+                    except Exception as e:
+                        raise RuntimeError(f"Failed to load model from {self.model_file}: {e}")
+        return self._model
+
+    def _load_optional(self, path, kind):
+        if not os.path.exists(path):
+            self.logger.warning("[WARN] %s file not found: %s", kind.capitalize(), path)
+            return None
         try:
-            self.model = pickle.load(open(model_file, 'rb'))
-            self.logger.info("[INFO] Loaded model: %s", model_file)
+            return load_artifact(path, kind)
         except Exception as e:
-            raise RuntimeError(f"Failed to load model from {model_file}: {e}")
+            self.logger.warning("[WARN] Failed to load %s %s: %s", kind, path, e)
+            return None
 
-        
-        if os.path.exists(encoder_file):
-            try:
-                self.encoder = pickle.load(open(encoder_file, 'rb'))
-                self.class_names = getattr(self.encoder, 'classes_', None)
-                self.logger.info("[INFO] Loaded label encoder: %s", encoder_file)
-            except Exception as e:
-                self.encoder = None
-                self.class_names = None
-                self.logger.warning("[WARN] Failed to load encoder %s: %s", encoder_file, e)
-        else:
-            self.encoder = None
-            self.class_names = None
-            self.logger.warning("[WARN] Encoder file not found: %s", encoder_file)
+    def _load_aux(self):
+        if not self._aux_loaded:
+            with self._load_lock:
+                if not self._aux_loaded:
+                    self._encoder = self._load_optional(self.encoder_file, "label encoder")
+                    self._scaler = self._load_optional(self.scaler_file, "scaler")
+                    self._aux_loaded = True
 
-        
-        if os.path.exists(scaler_file):
-            try:
-                self.scaler = pickle.load(open(scaler_file, 'rb'))
-                self.logger.info("[INFO] Loaded scaler: %s", scaler_file)
-            except Exception as e:
-                self.scaler = None
-                self.logger.warning("[WARN] Failed to load scaler %s: %s", scaler_file, e)
-        else:
-            self.scaler = None
-            self.logger.warning("[WARN] Scaler file not found: %s", scaler_file)
+    @property
+    def evaluator(self):
+        if self._evaluator is None and self.evaluator_file:
+            import time
+            from tree_evaluator import ObliviousTreeEvaluator
+
+            with self._load_lock:
+                if self._evaluator is None:
+                    start = time.perf_counter()
+                    digest = verify_artifact(self.evaluator_file)
+                    self._evaluator = ObliviousTreeEvaluator.load(self.evaluator_file)
+                    self.logger.info("[INFO] Loaded tree evaluator: %s (%.2fs, sha256 %s)",
+                                     self.evaluator_file, time.perf_counter() - start, digest[:12])
+        return self._evaluator
+
+    @property
+    def encoder(self):
+        # The tree evaluator carries the class names itself
+        if self.evaluator is not None and self.evaluator.class_names is not None:
+            return None
+        self._load_aux()
+        return self._encoder
+
+    @property
+    def class_names(self):
+        if self.evaluator is not None and self.evaluator.class_names is not None:
+            return self.evaluator.class_names
+        return getattr(self.encoder, 'classes_', None)
 
-    def _prepare(self, features):
+    @property
+    def scaler(self):
+        self._load_aux()
+        return self._scaler
+
+    def _prepare(self, features, scale=True):
         import pandas as pd
         import numpy as np
 
@@ -79,7 +135,7 @@ class Predictor:
         else:
             X_df = pd.DataFrame(features, columns=self.FEATURE_COLS)
 
-        if self.scaler is not None:
+        if scale and self.scaler is not None:
             try:
                 X_scaled = self.scaler.transform(X_df)
             except Exception as e:
@@ -90,12 +146,43 @@ class Predictor:
 
         return np.asarray(X_scaled)
 
-    def predict(self, features):
+    def _codes_from_proba(self, probs):
+        import numpy as np
+
+        idx = np.argmax(probs, axis=1)
+        classes = getattr(self.model, 'classes_', None)
+        if classes is not None and len(classes) == probs.shape[1]:
+            return np.asarray(classes)[idx]
+        return idx
+
+    def _predict_with_evaluator(self, features):
+        import numpy as np
+
+        # Scaling is folded into the evaluator's thresholds: feed raw features
+        X = self._prepare(features, scale=False)
+        if X is None:
+            return None, None, None
+        evaluator = self.evaluator
+        probs = evaluator.predict_proba(X)
+        raw_preds = evaluator.classes_[np.argmax(probs, axis=1)]
+        names = evaluator.class_names
+        if names is not None and np.issubdtype(raw_preds.dtype, np.integer):
+            labels = names[raw_preds]
+        else:
+            labels = raw_preds
+        return labels, probs, raw_preds
+
+    def predict(self, features, single_pass=None):
+        if self.evaluator is not None:
+            return self._predict_with_evaluator(features)
+
         X = self._prepare(features)
         if X is None:
             return None, None, None
 
-        raw_preds = self.model.predict(X)
+        if single_pass is None:
+            single_pass = self.single_pass
+
         probs = None
         if hasattr(self.model, 'predict_proba'):
             try:
@@ -103,6 +190,11 @@ class Predictor:
             except Exception:
                 probs = None
 
+        if single_pass and probs is not None:
+            raw_preds = self._codes_from_proba(probs)
+        else:
+            raw_preds = self.model.predict(X)
+
         
         if self.encoder is not None:
             try:
@@ -112,4 +204,53 @@ class Predictor:
         else:
             labels = raw_preds
 
-        return labels, probs, raw_preds
\ No newline at end of file
+        return labels, probs, raw_preds
+
+    def predict_batch(self, features_by_key):
+        """Predict many feature frames in one pass.
+
+        ``features_by_key`` maps a key (e.g. circ ID) to that circRNA's
+        cleaned features. The frames are stacked, scaled and scored once,
+        and the outputs are split back by row offset into
+        ``{key: (labels, probs, codes)}``.
+        """
+        import numpy as np
+        import pandas as pd
+
+        keys = [k for k, f in features_by_key.items() if f is not None and len(f)]
+        if not keys:
+            return {}
+
+        frames = [features_by_key[k].reindex(columns=self.FEATURE_COLS) for k in keys]
+        offsets = np.cumsum([0] + [len(f) for f in frames])
+        try:
+            labels, probs, codes = self.predict(pd.concat(frames, ignore_index=True))
+        except Exception as e:
+            self.logger.warning("[WARN] Batched prediction failed (%s); predicting %d circRNAs one by one",
+                                e, len(keys))
+            labels = None
+        if labels is None:
+            # One bad circRNA must not drop the rest of its batch
+            return self._predict_each(features_by_key, keys)
+
+        batch = {}
+        for key, start, end in zip(keys, offsets[:-1], offsets[1:]):
+            batch[key] = (
+                labels[start:end],
+                None if probs is None else probs[start:end],
+                codes[start:end],
+            )
+        self.logger.debug(f"[DEBUG] Batched prediction: {len(keys)} circRNAs, {offsets[-1]} sites")
+        return batch
+
+    def _predict_each(self, features_by_key, keys):
+        batch = {}
+        for key in keys:
+            try:
+                labels, probs, codes = self.predict(features_by_key[key])
+            except Exception as e:
+                self.logger.debug(f"[DEBUG] Prediction failed for {key}: {e}")
+                continue
+            if labels is not None:
+                batch[key] = (labels, probs, codes)
+        return batch
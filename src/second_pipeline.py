@@ -1,11 +1,15 @@
 import os
 import logging
+import numpy as np
 import pandas as pd
 from analysis_pipeline import AnalysisPipeline
 from mrna_overlap import overlap_mrnas
+from incidence import CircMirnaIncidence
 
 class SecondPipeline:
-    def __init__(self, circ_file, mirna_file, deg_file, model_file, encoder_file, scaler_file, temp_dir, output_dir, data_dir=None):
+    def __init__(self, circ_file, mirna_file, deg_file, model_file, encoder_file, scaler_file, temp_dir, output_dir, data_dir=None, max_concurrency=8, atlas_dir=None,
+                 predictor=None, grabber=None, atlas=None, workers=1, export_intermediates=False,
+                 mirdb_db=None, html_mode="inline", network_formats=("graphml", "parquet")):
         self.circ_file = circ_file
         self.mirna_file = mirna_file
         self.deg_file = deg_file
@@ -15,6 +19,9 @@ class SecondPipeline:
         self.temp_dir = temp_dir
         self.output_dir = output_dir
         self.data_dir = data_dir
+        self.max_concurrency = max_concurrency
+        self.atlas_dir = atlas_dir
+        self.workers = workers
 
         os.makedirs(temp_dir, exist_ok=True)
         os.makedirs(output_dir, exist_ok=True)
@@ -28,32 +35,43 @@ class SecondPipeline:
             scaler_file=scaler_file,
             temp_dir=temp_dir,
             output_dir=output_dir,
-            data_dir=data_dir
+            data_dir=data_dir,
+            max_concurrency=max_concurrency,
+            atlas_dir=atlas_dir,
+            predictor=predictor,
+            grabber=grabber,
+            atlas=atlas,
+            workers=workers,
+            export_intermediates=export_intermediates,
+            mirdb_db=mirdb_db,
+            html_mode=html_mode,
+            network_formats=network_formats
         )
+        # Stage tables shared with the first pipeline
+        self.artifacts = self.first_pipeline.artifacts
 
     def extract_overlapping_genes(self):
         logger = logging.getLogger()
-        path = os.path.join(self.temp_dir, "overlapping_mrnas.csv")
-        if not os.path.exists(path):
-            logger.error("[ERROR]  %s not found", path)
-            return []
         try:
-            df = pd.read_csv(path)
+            df = self.artifacts.get_or_load("overlapping_mrnas", self.temp_dir)
+            if df is None:
+                logger.error("[ERROR]  No overlapping mRNAs available (in memory or in %s)", self.temp_dir)
+                return []
             if "gene" not in df.columns:
-                logger.error("[ERROR]  'gene' column missing in %s", path)
+                logger.error("[ERROR]  'gene' column missing in overlapping mRNAs")
                 return []
             genes = df["gene"].dropna().unique().tolist()
             output_path = os.path.join(self.output_dir, "overlapping_genes.csv")
             try:
                 pd.DataFrame({"Gene": genes}).to_csv(output_path, index=False)
                 logger.info("[INFO]  Saved: %s", output_path)
-                logger.debug("[DEBUG] Extracted %d unique genes from %s", len(genes), path)
+                logger.debug("[DEBUG] Extracted %d unique genes", len(genes))
             except Exception as e:
                 logger.error("[ERROR]  Failed to save %s: %s", output_path, e)
                 return genes
             return genes
         except Exception as e:
-            logger.error("[ERROR]  Failed to extract genes from %s: %s", path, e)
+            logger.error("[ERROR]  Failed to extract overlapping genes: %s", e)
             return []
 
     def create_comprehensive_excel(self):
@@ -65,78 +83,38 @@ class SecondPipeline:
         
         try:
             
-            overlap_path = os.path.join(self.temp_dir, "overlapping_mrnas.csv")
-            if not os.path.exists(overlap_path):
-                logger.warning("[WARN]  No overlapping mRNAs file found, skipping Excel generation")
+            overlap_df = self.artifacts.get_or_load("overlapping_mrnas", self.temp_dir)
+            if overlap_df is None:
+                logger.warning("[WARN]  No overlapping mRNAs found, skipping Excel generation")
                 return
             
-            overlap_df = pd.read_csv(overlap_path)
             if overlap_df.empty:
                 logger.warning("[WARN]  No overlapping data found, skipping Excel generation")
                 return
             
             
-            comprehensive_data = []
-            
-            
-            import glob
-            match_files = glob.glob(os.path.join(self.temp_dir, '*_strong_medium_matches.csv'))
-            
-            
-            circ_mirna_map = {}
-            logger.info(f"[INFO]  Found {len(match_files)} circRNA match files")
-            
-            for match_file in match_files:
-                try:
-                    match_df = pd.read_csv(match_file)
-                    if 'circ_id' in match_df.columns and 'mirna_id' in match_df.columns:
-                        circ_id = match_df['circ_id'].iloc[0] if not match_df.empty else os.path.basename(match_file).split('_')[0]
-                        mirnas = match_df['mirna_id'].dropna().unique().tolist()
-                        for mirna in mirnas:
-                            if mirna not in circ_mirna_map:
-                                circ_mirna_map[mirna] = []
-                            circ_mirna_map[mirna].append(circ_id)
-                        logger.debug(f"[DEBUG] {circ_id}: {len(mirnas)} miRNAs")
-                except Exception as e:
-                    logger.debug(f"[DEBUG] Error reading {match_file}: {e}")
-                    continue
-            
-            logger.info(f"[INFO]  Created mapping for {len(circ_mirna_map)} miRNAs")
+            incidence = self.first_pipeline.matched_incidence
+            if incidence is None:
+                incidence = CircMirnaIncidence.from_sites(self.artifacts.get_or_load("matches", self.temp_dir))
+            logger.info(f"[INFO]  Found {len(incidence.circs)} circRNAs with matches")
+            logger.info(f"[INFO]  Created mapping for {len(incidence.mirnas)} miRNAs")
             
             
             logger.info(f"[INFO]  Processing {len(overlap_df)} gene-miRNA pairs")
             
-            for _, row in overlap_df.iterrows():
-                gene = row['gene']
-                mirna = row['mirna']
-                
-                
-                circrnas = circ_mirna_map.get(mirna, [])
-                
-                if circrnas:
-                    
-                    for circrna in circrnas:
-                        comprehensive_data.append({
-                            'Gene': gene,
-                            'miRNA': mirna,
-                            'circRNA': circrna,
-                            'Interaction_Type': 'circRNA→miRNA→mRNA'
-                        })
-                else:
-                    
-                    comprehensive_data.append({
-                        'Gene': gene,
-                        'miRNA': mirna,
-                        'circRNA': 'No circRNA interaction',
-                        'Interaction_Type': 'miRNA→mRNA only'
-                    })
+            # gene–miRNA pairs joined to every circRNA sponging that miRNA
+            circ_pairs = incidence.pairs()[["mirna_id", "circ_id"]].rename(columns={"mirna_id": "mirna"})
+            comprehensive_df = overlap_df[["gene", "mirna"]].astype(str).merge(circ_pairs, on="mirna", how="left")
+            has_circ = comprehensive_df["circ_id"].notna()
+            comprehensive_df["circ_id"] = comprehensive_df["circ_id"].where(has_circ, 'No circRNA interaction')
+            comprehensive_df["Interaction_Type"] = np.where(has_circ, 'circRNA→miRNA→mRNA', 'miRNA→mRNA only')
+            comprehensive_df = comprehensive_df.rename(columns={"gene": "Gene", "mirna": "miRNA", "circ_id": "circRNA"})
             
-            if not comprehensive_data:
+            if comprehensive_df.empty:
                 logger.warning("[WARN]  No comprehensive data generated")
                 return
             
             
-            comprehensive_df = pd.DataFrame(comprehensive_data)
             
             
             comprehensive_df = comprehensive_df.sort_values(['Gene', 'miRNA', 'circRNA'])
@@ -231,10 +209,16 @@ class SecondPipeline:
             if not os.path.exists(f):
                 raise FileNotFoundError(f"[ERROR] {f} not found")
 
-        results = self.first_pipeline.process_all_circs()
-        strong_hits, all_strong = self.first_pipeline.find_strong_hits(results)
-        self.first_pipeline.match_mirnas(results, strong_hits, all_strong)
-        overlapping = overlap_mrnas(self.deg_file, self.temp_dir, self.output_dir)
+        try:
+            results = self.first_pipeline.process_all_circs()
+            strong_hits, all_strong = self.first_pipeline.find_strong_hits(results)
+            self.first_pipeline.match_mirnas(results, strong_hits, all_strong)
+            overlapping = overlap_mrnas(self.deg_file, self.temp_dir, self.output_dir, artifacts=self.artifacts,
+                                        prefetcher=self.first_pipeline.mirdb_prefetcher,
+                                        mirdb_db=self.first_pipeline.mirdb_db)
+        finally:
+            # Stop the step-1 miRDB fetch threads whether or not the overlap ran
+            self.first_pipeline.close_prefetcher()
         self.extract_overlapping_genes()
         self.first_pipeline.construct_network(results, strong_hits, all_strong)
         
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+# Compact dtypes for per-circRNA binding-site tables. IDs and site types
+# repeat heavily within a table, so they are stored as categoricals;
+# scores and probabilities do not need float64 precision for reporting.
+SITE_SCHEMA = {
+    "circ_id": "category",
+    "mirna_id": "category",
+    "TargetScan miRNA predictions_Site Type": "category",
+    "predicted_site_type": "category",
+    "TargetScan miRNA predictions_CircRNA Start": "Int32",
+    "TargetScan miRNA predictions_CircRNA End": "Int32",
+    "TargetScan miRNA predictions_position": "Int32",
+    "TargetScan miRNA predictions_3' pairing": "float32",
+    "TargetScan miRNA predictions_local AU": "float32",
+    "TargetScan miRNA predictions_TA": "float32",
+    "TargetScan miRNA predictions_SPS": "float32",
+    "TargetScan miRNA predictions_context+ score": "float32",
+    "TargetScan miRNA predictions_context+ score percentile": "float32",
+    "encoded_prediction": "int8",
+}
+PROBABILITY_PREFIX = "prob_"
+STRONG_SITE_TYPES = ["7mer-m8", "8mer-1a"]
+_FALLBACK = {"Int32": "float32", "int8": None}
+
+
+def _target_dtype(col):
+    if col in SITE_SCHEMA:
+        return SITE_SCHEMA[col]
+    if str(col).startswith(PROBABILITY_PREFIX):
+        return "float32"
+    return None
+
+
+def apply_site_schema(df):
+    """Cast the known binding-site columns of ``df`` to their compact dtypes (in place)."""
+    if df is None:
+        return df
+    for col in df.columns:
+        dtype = _target_dtype(col)
+        if dtype is None or str(df[col].dtype) == dtype:
+            continue
+        try:
+            df[col] = df[col].astype(dtype)
+        except (TypeError, ValueError):
+            # e.g. fractional positions or non-numeric codes: keep what fits
+            fallback = _FALLBACK.get(dtype)
+            if fallback is not None:
+                df[col] = df[col].astype(fallback)
+    return df
+
+
+def site_memory_usage(results):
+    """Total deep memory (bytes) of a {circ_id: DataFrame} results mapping."""
+    return int(sum(df.memory_usage(deep=True).sum() for df in results.values()))
+
+
+def as_category(values):
+    return pd.Categorical(np.asarray(values).ravel())
+
+
+def attach_predictions(full_data, preds, probs, codes, class_names):
+    """Add predicted site type, code and per-class probabilities to a cleaned table."""
+    full_data["predicted_site_type"] = as_category(preds)
+    full_data["encoded_prediction"] = codes
+    for i, cname in enumerate(class_names):
+        full_data[f"{PROBABILITY_PREFIX}{cname}"] = probs[:, i]
+    return apply_site_schema(full_data)
+
+
+def strong_sites(full_data):
+    """Rows predicted as strong/medium (7mer-m8, 8mer-1a) sites."""
+    return full_data[full_data["predicted_site_type"].isin(STRONG_SITE_TYPES)].copy()
@@ -0,0 +1,143 @@
+import re
+import numpy as np
+import pandas as pd
+from io import BytesIO
+from lxml import etree
+
+
+# Attributes identifying the TargetScan results table on CircInteractome pages
+TABLE_ATTRS = {"border": "1", "bordercolor": "#006699"}
+
+# Same whitespace handling and missing-value markers as pandas.read_html
+_RE_WHITESPACE = re.compile(r"[\r\n]+|\s{2,}")
+_NA_VALUES = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+}
+# read_html drops "," from number-like cells (thousands=","), even in columns that stay text
+_RE_NUMBER = re.compile(r"^[\-\+]?([0-9]+,|[0-9])*(\.[0-9]*)?([0-9]?(E|e)\-?[0-9]+)?$")
+
+
+def _cell_text(cell):
+    return _RE_WHITESPACE.sub(" ", "".join(cell.itertext()).strip())
+
+
+def _expand_spans(rows):
+    # Mirrors pandas' colspan/rowspan expansion: spanned cells repeat the text.
+    expanded = []
+    pending = []  # (column index, text, rows remaining)
+    for row in rows:
+        out = []
+        carried = []
+        col = 0
+        cells = iter(row)
+        while True:
+            while pending and pending[0][0] == col:
+                idx, text, left = pending.pop(0)
+                out.append(text)
+                if left > 1:
+                    carried.append((idx, text, left - 1))
+                col += 1
+            cell = next(cells, None)
+            if cell is None:
+                break
+            text = _cell_text(cell)
+            rowspan = int(cell.get("rowspan") or 1) or 1
+            colspan = int(cell.get("colspan") or 1) or 1
+            for _ in range(colspan):
+                out.append(text)
+                if rowspan > 1:
+                    carried.append((col, text, rowspan - 1))
+                col += 1
+        for idx, text, left in pending:
+            out.append(text)
+            if left > 1:
+                carried.append((idx, text, left - 1))
+        expanded.append(out)
+        pending = carried
+    return expanded
+
+
+def _cell_value(text):
+    if text in _NA_VALUES:
+        return np.nan
+    if "," in text and _RE_NUMBER.search(text):
+        return text.replace(",", "")
+    return text
+
+
+def _convert_column(values):
+    s = pd.Series([_cell_value(v) for v in values], dtype=object)
+    if s.isna().all():
+        return s.astype(float)
+    try:
+        return pd.to_numeric(s)
+    except (ValueError, TypeError):
+        return s
+
+
+def _table_to_frame(table):
+    header_rows, body_rows = [], []
+    for tr in table.iter("tr"):
+        parent = tr.getparent()
+        cells = [c for c in tr if c.tag in ("th", "td")]
+        if parent is not None and parent.tag == "thead":
+            header_rows.append(cells)
+        else:
+            body_rows.append(cells)
+
+    # Without <thead>, leading rows made only of <th> cells are the header
+    if not header_rows:
+        while body_rows and body_rows[0] and all(c.tag == "th" for c in body_rows[0]):
+            header_rows.append(body_rows.pop(0))
+
+    header = _expand_spans(header_rows)
+    body = _expand_spans(body_rows)
+    width = max([len(r) for r in header + body] or [0])
+    body = [r + [""] * (width - len(r)) for r in body]
+
+    if len(header) > 1:
+        columns = []
+        for i in range(width):
+            levels = []
+            for level in range(2):
+                row = header[level]
+                name = row[i] if i < len(row) else ""
+                levels.append(name or f"Unnamed: {i}_level_{level}")
+            columns.append(f"{levels[0]}_{levels[1]}")
+    elif header:
+        columns = [(header[0][i] if i < len(header[0]) else "") or f"Unnamed: {i}" for i in range(width)]
+    else:
+        columns = list(range(width))
+
+    data = {}
+    for i, name in enumerate(columns):
+        data[name] = _convert_column([r[i] for r in body])
+    return pd.DataFrame(data, columns=columns)
+
+
+def _is_targets_table(table):
+    return all(table.get(k) == v for k, v in TABLE_ATTRS.items())
+
+
+def parse_targets_table(html):
+    """Extract the CircInteractome TargetScan table as a DataFrame (None if absent).
+
+    Parses the page in a single lxml pass and builds the frame with the
+    two-level header already flattened to ``"<top>_<sub>"`` column names.
+    """
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+    context = etree.iterparse(BytesIO(html), events=("end",), tag="table",
+                              html=True, recover=True, encoding="utf-8")
+    try:
+        for _, table in context:
+            if _is_targets_table(table):
+                return _table_to_frame(table)
+            # Free tables we are done with, unless they sit inside another
+            # table that may still turn out to be the target
+            if not any(a.tag == "table" for a in table.iterancestors()):
+                table.clear()
+    except etree.XMLSyntaxError:
+        return None
+    return None
@@ -0,0 +1,223 @@
+import os
+import json
+import logging
+import tempfile
+import numpy as np
+
+# Saved next to the model as e.g. "catboost_model.trees.npz"
+EVALUATOR_SUFFIX = ".trees.npz"
+
+
+def evaluator_path(model_file):
+    return os.path.splitext(model_file)[0] + EVALUATOR_SUFFIX
+
+
+def _scaler_params(scaler, n_features):
+    # Returns (mode, a, b) reproducing the scaler's own arithmetic:
+    #   "div": (x - a) / b   (StandardScaler, RobustScaler)
+    #   "mul": x * a + b     (MinMaxScaler)
+    if scaler is None:
+        return "div", np.zeros(n_features), np.ones(n_features)
+    if hasattr(scaler, "min_") and hasattr(scaler, "scale_"):
+        return "mul", np.asarray(scaler.scale_, dtype=np.float64), np.asarray(scaler.min_, dtype=np.float64)
+    center = None
+    if getattr(scaler, "with_mean", False):
+        center = getattr(scaler, "mean_", None)
+    elif getattr(scaler, "with_centering", False):
+        center = getattr(scaler, "center_", None)
+    scale = getattr(scaler, "scale_", None)
+    if not hasattr(scaler, "mean_") and not hasattr(scaler, "center_") and scale is None:
+        raise ValueError(f"Unsupported scaler for tree folding: {type(scaler).__name__}")
+    center = np.zeros(n_features) if center is None else np.asarray(center, dtype=np.float64)
+    scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+    return "div", center, scale
+
+
+def _apply_scaler(mode, a, b, x):
+    return (x - a) / b if mode == "div" else x * a + b
+
+
+def _fold_thresholds(features, borders, mode, a, b):
+    """Raw-space thresholds t with: raw x >= t  <=>  float32(scaled x) > border.
+
+    CatBoost compares float32 feature values against float32 borders, so
+    the exact boundary is found by walking float64 neighbours around the
+    analytic estimate until the predicate flips.
+    """
+    borders32 = borders.astype(np.float32)
+    a_f, b_f = a[features], b[features]
+    increasing = b_f > 0 if mode == "div" else a_f > 0
+    if not np.all(increasing):
+        raise ValueError("Scaler with non-positive scale cannot be folded into thresholds")
+
+    def holds(x):
+        return _apply_scaler(mode, a_f, b_f, x).astype(np.float32) > borders32
+
+    # Smallest float64 value rounding to a float32 above the border
+    upper = np.nextafter(borders32, np.float32(np.inf)).astype(np.float64)
+    midpoint = (borders32.astype(np.float64) + upper) / 2
+    x = midpoint * b_f + a_f if mode == "div" else (midpoint - b_f) / a_f
+
+    for _ in range(256):
+        ok = holds(x)
+        if ok.all():
+            break
+        x = np.where(ok, x, np.nextafter(x, np.inf))
+    for _ in range(256):
+        below = np.nextafter(x, -np.inf)
+        step = holds(below)
+        if not step.any():
+            break
+        x = np.where(step, below, x)
+    return x
+
+
+class ObliviousTreeEvaluator:
+    """Pure-NumPy scorer for a CatBoost oblivious-tree classifier.
+
+    The scaler is folded into per-split raw thresholds, so ``predict_proba``
+    takes unscaled features and needs neither catboost nor scikit-learn.
+    """
+
+    def __init__(self, split_features, thresholds, leaf_values, scale, bias,
+                 classes, class_names=None, chunk_size=4096):
+        self.split_features = np.asarray(split_features, dtype=np.int64)   # (trees, depth)
+        self.thresholds = np.asarray(thresholds, dtype=np.float64)         # (trees, depth)
+        self.leaf_values = np.asarray(leaf_values, dtype=np.float64)       # (trees, 2**depth, dim)
+        self.scale = float(scale)
+        self.bias = np.asarray(bias, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+        self.class_names = None if class_names is None else np.asarray(class_names)
+        self.chunk_size = chunk_size
+        self._tree_index = np.arange(self.split_features.shape[0])[None, :]
+        # Padding levels (shallower trees) carry an inf threshold and must never set their bit,
+        # not even for an inf feature value
+        self._active = np.isfinite(self.thresholds)
+
+    @classmethod
+    def from_catboost(cls, model, scaler=None, encoder=None):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "model.json")
+            model.save_model(path, format="json")
+            with open(path, encoding="utf-8") as f:
+                spec = json.load(f)
+
+        float_features = spec.get("features_info", {}).get("float_features", [])
+        flat_index = {i: ff.get("flat_feature_index", ff.get("feature_index", i))
+                      for i, ff in enumerate(float_features)}
+        n_features = max(flat_index.values(), default=-1) + 1
+        mode, a, b = _scaler_params(scaler, n_features)
+
+        trees = spec["oblivious_trees"]
+        depth = max(len(t["splits"]) for t in trees)
+        dim = len(trees[0]["leaf_values"]) // (2 ** len(trees[0]["splits"]))
+        split_features = np.zeros((len(trees), depth), dtype=np.int64)
+        borders = np.zeros((len(trees), depth), dtype=np.float64)
+        padded = np.zeros((len(trees), depth), dtype=bool)
+        leaf_values = np.zeros((len(trees), 2 ** depth, dim), dtype=np.float64)
+        for t, tree in enumerate(trees):
+            splits = tree["splits"]
+            for d, split in enumerate(splits):
+                if split.get("split_type", "FloatFeature") != "FloatFeature":
+                    raise ValueError(f"Unsupported split type: {split.get('split_type')}")
+                split_features[t, d] = flat_index[split["float_feature_index"]]
+                borders[t, d] = split["border"]
+            padded[t, len(splits):] = True
+            values = np.asarray(tree["leaf_values"], dtype=np.float64).reshape(-1, dim)
+            # Extra (padding) bits are always 0, so leaves beyond 2**len(splits) are never hit
+            leaf_values[t, :len(values)] = values
+
+        thresholds = _fold_thresholds(split_features.ravel(), borders.ravel(), mode, a, b).reshape(borders.shape)
+        thresholds[padded] = np.inf
+
+        scale, bias = spec.get("scale_and_bias", [1.0, [0.0] * dim])
+        bias = np.broadcast_to(np.asarray(bias, dtype=np.float64), (dim,))
+        class_names = getattr(encoder, "classes_", None) if encoder is not None else None
+        return cls(split_features, thresholds, leaf_values, scale, bias,
+                   getattr(model, "classes_", np.arange(max(dim, 2))), class_names)
+
+    def save(self, path):
+        arrays = dict(split_features=self.split_features, thresholds=self.thresholds,
+                      leaf_values=self.leaf_values, scale=np.float64(self.scale), bias=self.bias,
+                      classes=self.classes_.astype(str) if self.classes_.dtype == object else self.classes_)
+        if self.class_names is not None:
+            arrays["class_names"] = self.class_names.astype(str)
+        np.savez_compressed(path, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["split_features"], data["thresholds"], data["leaf_values"],
+                       data["scale"], data["bias"], data["classes"],
+                       data["class_names"] if "class_names" in data.files else None)
+
+    def raw_scores(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        n_trees, depth = self.split_features.shape
+        out = np.empty((X.shape[0], self.leaf_values.shape[2]))
+        for start in range(0, X.shape[0], self.chunk_size):
+            chunk = X[start:start + self.chunk_size]
+            # Leaf index of every (row, tree): one bit per tree level
+            leaves = np.zeros((len(chunk), n_trees), dtype=np.int64)
+            for d in range(depth):
+                bit = (chunk[:, self.split_features[:, d]] >= self.thresholds[:, d]) & self._active[:, d]
+                leaves |= bit.astype(np.int64) << d
+            out[start:start + len(chunk)] = self.leaf_values[self._tree_index, leaves].sum(axis=1)
+        return out * self.scale + self.bias
+
+    def predict_proba(self, X):
+        raw = self.raw_scores(X)
+        if raw.shape[1] == 1:
+            p = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - p, p])
+        raw = raw - raw.max(axis=1, keepdims=True)
+        expd = np.exp(raw)
+        return expd / expd.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def check_parity(evaluator, model, scaler=None, X=None, n_samples=20000, seed=0):
+    """Compare the evaluator with ``model.predict_proba`` on (scaled) inputs.
+
+    Without ``X``, samples span every folded threshold and include points
+    exactly on and just below each one. Returns the max absolute
+    probability difference and the fraction of matching labels.
+    """
+    rng = np.random.default_rng(seed)
+    if X is None:
+        n_features = int(evaluator.split_features.max()) + 1
+        thresholds = evaluator.thresholds[np.isfinite(evaluator.thresholds)]
+        lo, hi = thresholds.min() - 1, thresholds.max() + 1
+        X = rng.uniform(lo, hi, size=(n_samples, n_features))
+        for f in range(n_features):
+            t = evaluator.thresholds[(evaluator.split_features == f) & np.isfinite(evaluator.thresholds)]
+            if t.size:
+                edge = rng.choice(np.concatenate([t, np.nextafter(t, -np.inf)]), size=n_samples // 4)
+                X[:n_samples // 4, f] = edge
+    X = np.asarray(X, dtype=np.float64)
+    X_model = scaler.transform(X) if scaler is not None else X
+    expected = np.asarray(model.predict_proba(X_model))
+    actual = evaluator.predict_proba(X)
+    result = {
+        "max_abs_diff": float(np.abs(expected - actual).max()),
+        "label_agreement": float(np.mean(expected.argmax(axis=1) == actual.argmax(axis=1))),
+        "samples": int(len(X)),
+    }
+    logging.getLogger().info("[INFO] Tree evaluator parity: max |dp| %.2e, label agreement %.4f on %d samples",
+                             result["max_abs_diff"], result["label_agreement"], result["samples"])
+    return result
+
+
+def export_evaluator(model, scaler=None, encoder=None, path=None, tolerance=1e-6):
+    """Export a CatBoost model (+ scaler) to an .npz evaluator after a parity check."""
+    evaluator = ObliviousTreeEvaluator.from_catboost(model, scaler, encoder)
+    parity = check_parity(evaluator, model, scaler)
+    if parity["max_abs_diff"] > tolerance or parity["label_agreement"] < 1.0:
+        raise RuntimeError(f"Tree evaluator does not match the model: {parity}")
+    if path is not None:
+        evaluator.save(path)
+        logging.getLogger().info("[INFO] Tree evaluator written: %s", path)
+    return evaluator
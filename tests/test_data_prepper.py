@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from data_prepper import DataPrepper, MIRBASE_ID_COL, PAIRING_COL
+
+
+def _table(ids):
+    prepper = DataPrepper()
+    table = pd.DataFrame({MIRBASE_ID_COL: pd.Series(ids, dtype=object), PAIRING_COL: "|||| ||"})
+    for col in prepper.numeric_cols:
+        table[col] = "1.5"
+    return prepper, table
+
+
+def test_split_ids_matches_per_row_rule():
+    prepper, table = _table([
+        "hsa_circ_0000001\xa0hsa-miR-21-5p",
+        "hsa_circ_0000002 other hsa-miR-155-3p hsa-miR-1-5p",
+        "hsa_circ_0000003 no-mirna",
+    ])
+    features, data = prepper.clean(table, None)
+
+    assert list(data["circ_id"].astype(str)) == ["hsa_circ_0000001", "hsa_circ_0000002", "hsa_circ_0000003"]
+    assert list(data["mirna_id"].astype(str)) == ["hsa-miR-21-5p", "hsa-miR-155-3p", "none"]
+    assert (features[prepper.numeric_cols] == 1.5).all().all()
+
+
+def test_missing_ids_are_kept_instead_of_failing_the_table():
+    # The per-row split raised AttributeError on NaN (and IndexError on blank
+    # IDs), failing the whole circRNA; such rows now stay with no circRNA ID.
+    prepper, table = _table(["hsa_circ_0000001 hsa-miR-21-5p", np.nan, "   "])
+    table.loc[1, prepper.numeric_cols[0]] = "n/a"
+    features, data = prepper.clean(table, None)
+
+    assert len(data) == 3
+    assert data["circ_id"].iloc[0] == "hsa_circ_0000001"
+    assert data["circ_id"].iloc[1:].isna().all()
+    assert list(data["mirna_id"].astype(str)) == ["hsa-miR-21-5p", "none", "none"]
+    assert features[MIRBASE_ID_COL].iloc[1] == "missing"
+    assert features[prepper.numeric_cols[0]].iloc[1] == 0
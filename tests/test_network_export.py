@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+nx = pytest.importorskip("networkx")
+pytest.importorskip("scipy")
+
+from network_export import export_network, load_network
+
+
+def _graph():
+    G = nx.DiGraph()
+    G.add_node("hsa_circ_0000001", type="circRNA", note="x")
+    G.add_node("hsa-miR-21-5p", type="miRNA")
+    G.add_node("PTEN", type="mRNA", note=7)
+    G.add_edge("hsa_circ_0000001", "hsa-miR-21-5p", kind="sponge")
+    G.add_edge("hsa-miR-21-5p", "PTEN")
+    return G
+
+
+@pytest.mark.parametrize("fmt", ["npz", "parquet"])
+def test_missing_attributes_stay_missing(tmp_path, fmt):
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow")
+    stem = str(tmp_path / "net")
+    export_network(_graph(), stem, formats=(fmt,))
+    G = load_network(stem)
+
+    assert G.is_directed()
+    assert list(G.nodes) == ["hsa_circ_0000001", "hsa-miR-21-5p", "PTEN"]
+    assert G.nodes["hsa_circ_0000001"] == {"type": "circRNA", "note": "x"}
+    assert G.nodes["hsa-miR-21-5p"] == {"type": "miRNA"}
+    assert G.nodes["PTEN"] == {"type": "mRNA", "note": "7"}
+    assert G.edges["hsa_circ_0000001", "hsa-miR-21-5p"] == {"kind": "sponge"}
+    assert G.edges["hsa-miR-21-5p", "PTEN"] == {}
+
+
+def test_npz_is_preferred_and_loads_without_pickle(tmp_path):
+    pytest.importorskip("pyarrow")
+    stem = str(tmp_path / "net")
+    export_network(_graph(), stem, formats=("parquet", "npz"))
+    G = load_network(stem)
+
+    assert G.number_of_nodes() == 3 and G.number_of_edges() == 2
+
+
+def test_parquet_accepts_mixed_type_attributes(tmp_path):
+    pytest.importorskip("pyarrow")
+    stem = str(tmp_path / "net")
+    export_network(_graph(), stem, formats=("parquet",))
+    G = load_network(stem)
+
+    assert G.nodes["PTEN"]["note"] == "7"
+    assert "note" not in G.nodes["hsa-miR-21-5p"]
@@ -0,0 +1,47 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("sklearn")
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from predictor import Predictor
+
+SITE_TYPES = ["7mer-1a", "7mer-m8", "8mer-1a"]
+
+
+def _dump(obj, path):
+    with open(path, "wb") as f:
+        pickle.dump(obj, f)
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def features():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(rng.normal(size=(300, len(Predictor.FEATURE_COLS))), columns=Predictor.FEATURE_COLS)
+
+
+@pytest.fixture(scope="module")
+def predictor(tmp_path_factory, features):
+    tmp = tmp_path_factory.mktemp("models")
+    labels = np.array(SITE_TYPES)[(features.iloc[:, 0] > 0).to_numpy().astype(int) +
+                                   (features.iloc[:, 1] > 0.5).to_numpy().astype(int)]
+    encoder = LabelEncoder().fit(labels)
+    scaler = StandardScaler().fit(features)
+    model = GradientBoostingClassifier(n_estimators=20, max_depth=2, random_state=0)
+    model.fit(scaler.transform(features), encoder.transform(labels))
+    return Predictor(_dump(model, tmp / "model.pkl"), _dump(encoder, tmp / "encoder.pkl"),
+                     _dump(scaler, tmp / "scaler.pkl"))
+
+
+def test_single_pass_labels_match_two_pass(predictor, features):
+    fast, fast_probs, fast_codes = predictor.predict(features, single_pass=True)
+    slow, slow_probs, slow_codes = predictor.predict(features, single_pass=False)
+    np.testing.assert_array_equal(np.asarray(fast).ravel(), np.asarray(slow).ravel())
+    np.testing.assert_array_equal(np.asarray(fast_codes).ravel(), np.asarray(slow_codes).ravel())
+    np.testing.assert_allclose(fast_probs, slow_probs)
+    assert set(fast) <= set(SITE_TYPES)
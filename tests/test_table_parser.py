@@ -0,0 +1,66 @@
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("lxml")
+
+from table_parser import TABLE_ATTRS, parse_targets_table
+
+_TABLE = """
+<table border="1" bordercolor="#006699">
+<tr><th colspan="4">TargetScan miRNA predictions</th><th rowspan="2">Note</th></tr>
+<tr><th>CircRNA Mirbase ID</th><th>CircRNA Start</th><th>context+ score</th><th>Site Type</th></tr>
+<tr><td>hsa_circ_0000001&nbsp;hsa-miR-21-5p</td><td>1,234</td><td>-0.25</td>
+    <td rowspan="2">8mer-1a</td><td>first
+    line</td></tr>
+<tr><td>hsa_circ_0000001   hsa-miR-155-3p</td><td>n/a</td><td>NA</td><td></td></tr>
+<tr><td>hsa_circ_0000002 hsa-miR-1-3p</td><td>12</td><td colspan="2">spanned</td><td><b>bold</b> text</td></tr>
+</table>
+"""
+
+_PAGE = f"""<html><body>
+<table><tr><td>layout
+  <table border="1"><tr><th>Other</th></tr><tr><td>1</td></tr></table>
+  {_TABLE}
+</td></tr></table>
+</body></html>"""
+
+
+def _read_html(html):
+    # The BeautifulSoup + read_html path parse_targets_table replaced
+    df = pd.read_html(StringIO(html), attrs=TABLE_ATTRS)[0]
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = [f"{col[0]}_{col[1]}" for col in df.columns]
+    return df
+
+
+@pytest.mark.parametrize("html", [_TABLE, _PAGE], ids=["table", "nested_page"])
+def test_matches_read_html(html):
+    expected = _read_html(html)
+    parsed = parse_targets_table(html)
+
+    pd.testing.assert_frame_equal(parsed, expected, check_dtype=False, check_column_type=False)
+    assert list(parsed.columns)[:2] == ["TargetScan miRNA predictions_CircRNA Mirbase ID",
+                                        "TargetScan miRNA predictions_CircRNA Start"]
+    start = parsed["TargetScan miRNA predictions_CircRNA Start"]
+    assert start.iloc[0] == 1234 and np.isnan(start.iloc[1]) and start.iloc[2] == 12
+    score = parsed["TargetScan miRNA predictions_context+ score"]
+    assert list(score.iloc[[0, 2]]) == ["-0.25", "spanned"] and pd.isna(score.iloc[1])
+    assert list(parsed["TargetScan miRNA predictions_Site Type"]) == ["8mer-1a", "8mer-1a", "spanned"]
+    note = parsed["Note_Note"]
+    assert pd.isna(note.iloc[1]) and note.iloc[2] == "bold text"
+
+
+def test_thousands_separator_dropped_in_text_columns():
+    # read_html strips "," from number-like cells even when the column stays text
+    html = _TABLE.replace("<td>12</td>", "<td>twelve</td>")
+    parsed = parse_targets_table(html)
+
+    pd.testing.assert_frame_equal(parsed, _read_html(html), check_dtype=False, check_column_type=False)
+    assert list(parsed["TargetScan miRNA predictions_CircRNA Start"].iloc[[0, 2]]) == ["1234", "twelve"]
+
+
+def test_page_without_targets_table():
+    assert parse_targets_table("<html><body><table><tr><td>x</td></tr></table></body></html>") is None
@@ -0,0 +1,75 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tree_evaluator import ObliviousTreeEvaluator, check_parity
+
+
+class _JsonModel:
+    """Stands in for a CatBoost model: ``save_model(format="json")`` writes a fixed spec."""
+
+    def __init__(self, spec, classes):
+        self.spec = spec
+        self.classes_ = np.asarray(classes)
+
+    def save_model(self, path, format="json"):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.spec, f)
+
+
+def _padded_model():
+    # Tree 0 has two levels, tree 1 only one: the evaluator pads tree 1 to depth 2
+    return _JsonModel({
+        "features_info": {"float_features": [{"flat_feature_index": 0}, {"flat_feature_index": 1}]},
+        "oblivious_trees": [
+            {"splits": [{"float_feature_index": 0, "border": 0.5},
+                        {"float_feature_index": 1, "border": 0.0}],
+             "leaf_values": [0.0, 1.0, 2.0, 3.0]},
+            {"splits": [{"float_feature_index": 1, "border": 1.0}],
+             "leaf_values": [10.0, 20.0]},
+        ],
+        "scale_and_bias": [1.0, [0.0]],
+    }, classes=[0, 1])
+
+
+def test_padded_levels_never_set_their_bit():
+    evaluator = ObliviousTreeEvaluator.from_catboost(_padded_model())
+    assert not np.isfinite(evaluator.thresholds[1, 1])
+    X = np.array([
+        [0.0, -1.0],      # tree 0 leaf 0, tree 1 leaf 0
+        [1.0, 0.5],       # tree 0 leaf 3, tree 1 leaf 0
+        [1.0, 2.0],       # tree 0 leaf 3, tree 1 leaf 1
+        [1.0, np.inf],    # an inf feature must not reach tree 1's padded leaf 3
+    ])
+    np.testing.assert_array_equal(evaluator.raw_scores(X)[:, 0], [10.0, 13.0, 23.0, 23.0])
+
+
+def test_padded_levels_survive_save_and_load(tmp_path):
+    evaluator = ObliviousTreeEvaluator.from_catboost(_padded_model())
+    loaded = ObliviousTreeEvaluator.load(evaluator.save(str(tmp_path / "model.trees.npz")))
+    X = np.array([[1.0, np.inf], [0.0, 2.0]])
+    np.testing.assert_array_equal(loaded.raw_scores(X), evaluator.raw_scores(X))
+
+
+def test_parity_with_catboost():
+    catboost = pytest.importorskip("catboost")
+    pytest.importorskip("sklearn")
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(400, 4)), columns=list("abcd"))
+    labels = np.array(["7mer-1a", "7mer-m8", "8mer-1a"])[(X["a"] > 0).to_numpy().astype(int) +
+                                                         (X["b"] > 0.5).to_numpy().astype(int)]
+    encoder = LabelEncoder().fit(labels)
+    scaler = StandardScaler().fit(X.to_numpy())
+    model = catboost.CatBoostClassifier(iterations=25, depth=3, loss_function="MultiClass",
+                                        random_seed=0, verbose=False)
+    model.fit(scaler.transform(X.to_numpy()), encoder.transform(labels))
+
+    evaluator = ObliviousTreeEvaluator.from_catboost(model, scaler, encoder)
+    parity = check_parity(evaluator, model, scaler, n_samples=4000)
+    assert parity["max_abs_diff"] <= 1e-6
+    assert parity["label_agreement"] == 1.0
+    np.testing.assert_array_equal(evaluator.class_names, encoder.classes_)